@@ -9,8 +9,10 @@ import re
 import math
 import datetime
 import json
+import bisect
 import hashlib
-import requests
+import shutil
+from urllib.parse import urlsplit
 
 # Required GTK and Adwaita versions
 gi.require_version('Gtk', '4.0')
@@ -19,13 +21,27 @@ gi.require_version('GdkPixbuf', '2.0')
 gi.require_version('Gsk', '4.0')
 from gi.repository import Gtk, Adw, Gio, GLib, Gdk, Pango, GdkPixbuf, Gsk
 
-from .config import SUPPORTED_STATIC, SUPPORTED_LIVE
+from .config import (
+    SUPPORTED_STATIC, SUPPORTED_LIVE, THUMBNAIL_SIZE, PREWARM_IDLE_SECONDS, ONLINE_PREFETCH_SCREENS, ONLINE_PREVIEW_CACHE_FILES,
+    RECODE_FPS_TOLERANCE
+)
 from .data_models import RecodeQueueItem, WallpaperItem, OnlineWallpaperItem, DownloadQueueItem
-from .online import search_wallhaven
+from .online import (
+    search_wallhaven, build_search_params, OnlineThumbnailCache, SearchCache,
+    CancelToken, RequestCancelled, DownloadManager, DownloadBatch, OnlinePreview
+)
+from .engine import OnlineEngine
+from .recode import (
+    RecodeScheduler, RECODE_PROFILES, DEFAULT_RECODE_PROFILE, probe_duration, probe_video, compare_profiles,
+    variant_key, pick_variant, probe_keyframes, loop_end, loop_filter_graph
+)
+from .library import LibraryIndex, LibraryWatcher
+from .cache import TextureCache, TextureLoader
+from .thumbnails import ThumbnailScheduler, ThumbnailManifest, content_digest, PRIORITY_VISIBLE, PRIORITY_BACKGROUND
 from .ui.preferences import PreferencesWindow
 from .ui.window import MainWindow
 from .ui.dialogs import (
-    create_confirmation_dialog, create_url_input_dialog,
+    create_confirmation_dialog, create_message_dialog, create_url_input_dialog,
     create_properties_dialog, create_online_properties_dialog,
     create_about_dialog, create_shortcuts_window
 )
@@ -34,6 +50,18 @@ from .utils import (
     get_monitor_aspect_ratio, kill_backend_processes, build_command
 )
 
+class _StoreOrderKeys:
+    """Read-only view of a store's _store_order keys, so bisect can search the store directly."""
+    def __init__(self, store, order):
+        self.store = store
+        self.order = order
+
+    def __len__(self):
+        return self.store.get_n_items()
+
+    def __getitem__(self, position):
+        return self.order(self.store.get_item(position).path)
+
 # --- Main Application Class ---
 class Manpaper(Adw.Application):
     """The main application class for Manpaper."""
@@ -50,6 +78,10 @@ class Manpaper(Adw.Application):
         self.online_resolution_text = ""
         self.online_atleast_text = ""
         self.online_ratio_text = ""
+        self.online_search_token = CancelToken() # Replaced for every new query; shared by its pages
+        self.online_last_page = None
+        self.online_first_page_size = 0 # Items of page 1 at the start of online_store
+        self.online_page_loading = False
         self.right_clicked_item = None
         self.mpv_process = None
 
@@ -69,10 +101,6 @@ class Manpaper(Adw.Application):
 
         self.spinner = Gtk.Spinner(halign=Gtk.Align.CENTER, valign=Gtk.Align.CENTER, spinning=False, visible=False)
         
-        self.recode_queue = []
-        self.recode_currently_running = None
-        self.recode_lock = threading.Lock()
-        self.recode_process = None
         self.recode_popover_store = Gio.ListStore.new(RecodeQueueItem)
         # self.active_downloads = {} # Remove this
 
@@ -80,8 +108,13 @@ class Manpaper(Adw.Application):
 
 
         # --- Threading and Caching Attributes ---
-        self.thumbnail_lock = threading.Lock()
-        self.thumbnails_in_progress = set()
+        self.thumbnail_scheduler = ThumbnailScheduler()
+        self.prewarm_jobs = None
+        self.prewarm_total = 0
+        self.thumbnail_gc_running = False
+        self.thumbnail_gc_done = False
+        self.library_refreshed_root = None # Wallpaper directory whose files were re-stat-ed this session
+        self.thumbnail_retried = set() # Sources whose unreadable thumbnail was already regenerated once
         self.background_tasks = 0
         
         self.preview_size = self.settings.get_int('preview-size')
@@ -99,6 +132,16 @@ class Manpaper(Adw.Application):
         self.swww_fill_type = self.settings.get_string('swww-fill-type')
         self.swww_transition_fps = self.settings.get_int('swww-transition-fps')
         self.mpvpaper_fill_type = self.settings.get_string('mpvpaper-fill-type')
+        self.texture_cache_budget = self.settings.get_int('texture-cache-budget')
+        self.thumbnail_cache_max_size = self.settings.get_int('thumbnail-cache-max-size')
+        self.search_cache_ttl = self.settings.get_int('search-cache-ttl')
+        self.download_bandwidth_limit = self.settings.get_int('download-bandwidth-limit')
+        self.recode_workers = self.settings.get_int('recode-workers')
+        self.recode_thread_budget = self.settings.get_int('recode-thread-budget')
+        self.recode_profile = self.settings.get_string('recode-profile')
+        self.recode_max_fps = self.settings.get_int('recode-max-fps')
+        self.loop_crossfade = self.settings.get_double('loop-crossfade')
+        self.monitor_refresh_rate = None # Looked up on first use; reset when monitors or the fps cap change
         if self.swww_transition_fps == 0: # Sentinel for first run
             self.swww_transition_fps = get_monitor_refresh_rate()
             self.settings.set_int('swww-transition-fps', self.swww_transition_fps)
@@ -106,15 +149,37 @@ class Manpaper(Adw.Application):
         
         self.aspect_ratio = get_monitor_aspect_ratio()
         self.preview_adjustment = None
-        self.texture_cache = {}
+        self.texture_cache = TextureCache(self.texture_cache_budget * 1024 * 1024)
+        self.texture_loader = TextureLoader(self.texture_cache)
         self.cache_dir = Path(GLib.get_user_cache_dir()) / 'manpaper' / 'thumbnails'
         self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.library_index = LibraryIndex(self.cache_dir.parent / 'library.db')
+        self.online_thumbnail_cache = OnlineThumbnailCache(self.cache_dir.parent / 'online')
+        self.online_preview_dir = self.cache_dir.parent / 'previews'
+        self.online_preview_dir.mkdir(parents=True, exist_ok=True)
+        self.online_previews = {} # wall_id -> OnlinePreview of an open properties dialog
+        self.online_engine = OnlineEngine()
+        self.download_manager = DownloadManager(bytes_per_second=self.download_bandwidth_limit * 1024)
+        self.downloading_paths = set()
+        self.downloaded_walls = {} # wall_id -> path of wallpapers downloaded into the wallpaper directory
+        self.recode_scheduler = RecodeScheduler(self._perform_recode, self._on_recode_finished, self._update_recode_ui,
+                                                on_progress=self._on_recode_progress,
+                                                workers=self.recode_workers, thread_budget=self.recode_thread_budget,
+                                                log_path=self.cache_dir.parent / 'recode_log.jsonl')
+        self.recode_rows = {} # RecodeJob -> RecodeQueueItem shown in the recode popover
+        self.video_info = {} # path -> (mtime, VideoInfo or None) of live wallpapers that have recoded variants
+        self.live_variant_groups = {} # variant_key -> paths of a video and its recoded versions
+        self.preferred_variants = {} # variant_key -> path of the variant to show when originals are hidden
+        self.search_cache = SearchCache(self.cache_dir.parent / 'search_cache.json', self.search_cache_ttl * 60)
+        self.thumbnail_manifest = ThumbnailManifest(self.cache_dir, self.cache_dir.parent / 'thumbnails.db')
+        self.library_watcher = LibraryWatcher(self._on_library_changed)
         
         self.css_provider = Gtk.CssProvider()
         self.corner_radius_css_provider = Gtk.CssProvider()
         self.custom_css_provider = Gtk.CssProvider()
         self._update_css()
         display = Gdk.Display.get_default()
+        display.get_monitors().connect('items-changed', self._on_monitors_changed)
         Gtk.StyleContext.add_provider_for_display(display, self.css_provider, Gtk.STYLE_PROVIDER_PRIORITY_APPLICATION)
         Gtk.StyleContext.add_provider_for_display(display, self.corner_radius_css_provider, Gtk.STYLE_PROVIDER_PRIORITY_USER)
         self._update_corner_radius_css()
@@ -144,7 +209,8 @@ class Manpaper(Adw.Application):
     def _on_shutdown(self, app):
         """Clean up resources on application exit."""
         # The mpvpaper process is no longer terminated here to allow it to persist.
-        pass
+        self.online_engine.stop()
+        self.online_thumbnail_cache.flush()
 
     def run_in_background(self, target_func, callback_func, *args, **kwargs):
         """Helper to run a function in a background thread using GTask."""
@@ -362,8 +428,7 @@ class Manpaper(Adw.Application):
         bookmarks.append(new_bookmark)
         self.settings.set_string('video-bookmarks', json.dumps(bookmarks))
         
-        new_item = WallpaperItem(path=url, title=title)
-        self.live_store.append(new_item)
+        self._insert_item(self.live_store, WallpaperItem(path=url, title=title))
         self.window.toast_overlay.add_toast(Adw.Toast.new(f"Added: {title}"))
         return False  # For GLib.idle_add
 
@@ -454,8 +519,9 @@ class Manpaper(Adw.Application):
         """Called after YouTube video download completes."""
         try:
             # Add only the downloaded file to live wallpapers with the YouTube title
-            new_item = WallpaperItem(path=video_path, title=title)
-            self.live_store.append(new_item)
+            stat = video_path.stat()
+            self._insert_item(self.live_store, WallpaperItem(path=video_path, title=title,
+                                                             mtime=stat.st_mtime_ns, size=stat.st_size))
             
             self.window.toast_overlay.add_toast(Adw.Toast.new(f"Downloaded: {title}"))
             self._load_wallpapers_async()  # Refresh to show the new video
@@ -468,14 +534,13 @@ class Manpaper(Adw.Application):
 
 
     def _get_online_wallpaper_local_path(self, item):
-        """Determines the expected local path for a downloaded online wallpaper."""
-        wallpaper_dir_str = self.settings.get_string('wallpaper-dir')
-        if not wallpaper_dir_str:
-            return None
-        
-        file_extension = Path(item.full_url).suffix
-        file_path = Path(wallpaper_dir_str) / f"{item.wall_id}{file_extension}"
-        return file_path if file_path.exists() else None
+        """Returns the local path of a downloaded online wallpaper, or None. No filesystem access."""
+        return self.downloaded_walls.get(item.wall_id)
+
+    @staticmethod
+    def _downloaded_walls_from_entries(root, entries):
+        """Maps file stems to paths for images directly in root, which is where downloads are saved."""
+        return {entry.path.stem: entry.path for entry in entries if entry.path.parent == root}
 
     def _on_download_wallpaper_clicked(self, button, item):
         """Handles the 'Download' button click for an online wallpaper."""
@@ -485,40 +550,146 @@ class Manpaper(Adw.Application):
             self.window.toast_overlay.add_toast(Adw.Toast.new("Wallpaper directory not set."))
             return
 
+        file_path = self._online_download_path(item, wallpaper_dir_str)
+        if file_path in self.downloading_paths:
+            self.window.toast_overlay.add_toast(Adw.Toast.new(f"{item.wall_id} is already downloading."))
+            return
+        self.downloading_paths.add(file_path)
+
         # Add to download popover store
-        download_queue_item = DownloadQueueItem(f"Downloading {item.wall_id}", "Downloading", item)
+        download_queue_item = DownloadQueueItem(f"Downloading {item.wall_id}", "Queued", item)
         self.download_popover_store.append(download_queue_item)
         self._update_download_ui() # Update the popover UI
 
-        def download_worker(item_to_dl, wallpaper_dir_path):
-            print(f"Starting download for {item_to_dl.wall_id} from {item_to_dl.full_url}")
-            response = requests.get(item_to_dl.full_url, stream=True)
-            response.raise_for_status()
-            print(f"Successfully fetched content for {item_to_dl.wall_id}")
+        def on_finished(job, error):
+            if isinstance(error, RequestCancelled):
+                GLib.idle_add(self._on_download_finished, item, False, job.dest, None, download_queue_item)
+            elif error:
+                GLib.idle_add(self._on_download_finished, item, False, job.dest, str(error), download_queue_item)
+            else:
+                GLib.idle_add(self._on_download_finished, item, True, job.dest, None, download_queue_item)
+
+        preview = self._adopt_online_preview(item, file_path)
+        if preview:
+            def on_finished(job, error, on_finished=on_finished):
+                preview.finish()
+                on_finished(job, error)
+
+        print(f"Queueing download for {item.wall_id} from {item.full_url}")
+        download_queue_item.job = self.download_manager.submit(
+            item.full_url, file_path,
+            on_progress=lambda job: GLib.idle_add(self._on_download_progress, job, download_queue_item),
+            on_finished=on_finished,
+            on_chunk=preview.feed if preview else None)
+
+    def _online_preview_path(self, item):
+        """Where the properties dialog streams the full-size image of an online wallpaper."""
+        return self.online_preview_dir / f"{item.wall_id}{Path(item.full_url).suffix}"
+
+    def _adopt_online_preview(self, item, file_path):
+        """
+        Moves the bytes already streamed for item's preview to file_path's .part file,
+        so the download only fetches the rest. Returns the preview if it was still
+        streaming; the download then keeps feeding it.
+        """
+        preview = self.online_previews.pop(item.wall_id, None)
+        if preview and not preview.hand_off():
+            preview = None
+        preview_path = self._online_preview_path(item)
+        part_path = file_path.with_name(file_path.name + '.part')
+        if preview_path.exists() and not part_path.exists():
+            try:
+                shutil.move(preview_path, part_path)
+            except OSError as e:
+                print(f"Could not reuse preview of {item.wall_id}: {e}")
+                preview = None
+        elif preview:
+            preview.cancel() # The download starts from its own .part file and can't feed the preview in order
+            preview = None
+        return preview
+
+    def _online_download_path(self, item, wallpaper_dir_str):
+        """Where a downloaded online wallpaper is stored."""
+        return Path(wallpaper_dir_str) / f"{item.wall_id}{Path(item.full_url).suffix}"
+
+    def _on_download_all_online_activated(self, action, param):
+        """Downloads every wallpaper in the current online results that isn't downloaded yet."""
+        items = [self.online_store.get_item(i) for i in range(self.online_store.get_n_items())]
+        self._download_online_wallpapers(items)
+
+    def _download_online_wallpapers(self, items):
+        """Queues several downloads shown as a single entry in the download popover."""
+        wallpaper_dir_str = self.settings.get_string('wallpaper-dir')
+        if not wallpaper_dir_str:
+            self.window.toast_overlay.add_toast(Adw.Toast.new("Wallpaper directory not set."))
+            return
 
-            file_extension = Path(item_to_dl.full_url).suffix
-            file_path = Path(wallpaper_dir_path) / f"{item_to_dl.wall_id}{file_extension}"
-            print(f"Saving {item_to_dl.wall_id} to {file_path}")
+        todo = []
+        for item in items:
+            file_path = self._online_download_path(item, wallpaper_dir_str)
+            if file_path not in self.downloading_paths and not self._get_online_wallpaper_local_path(item):
+                todo.append((item, file_path))
+        if not todo:
+            self.window.toast_overlay.add_toast(Adw.Toast.new("All results are already downloaded."))
+            return
 
-            with open(file_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
-            print(f"Download and save complete for {item_to_dl.wall_id}")
-            return item_to_dl, file_path
+        batch = DownloadBatch()
+        download_queue_item = DownloadQueueItem(f"Downloading {len(todo)} wallpapers", f"0 of {len(todo)}", None)
+        download_queue_item.job = batch
+        self.download_popover_store.append(download_queue_item)
+        self._update_download_ui()
+
+        def on_finished(job, error, item):
+            GLib.idle_add(self._on_batch_download_finished, batch, download_queue_item, item, job, error)
+
+        for item, file_path in todo:
+            self.downloading_paths.add(file_path)
+            batch.jobs.append(self.download_manager.submit(
+                item.full_url, file_path,
+                on_progress=lambda job: GLib.idle_add(self._on_batch_download_progress, batch, download_queue_item),
+                on_finished=lambda job, error, item=item: on_finished(job, error, item)))
+        print(f"Queued {len(todo)} downloads.")
+
+    def _on_batch_download_progress(self, batch, download_queue_item):
+        """Shows how many downloads of a batch are done and the combined transfer rate."""
+        download_queue_item.status = f"{batch.done} of {len(batch.jobs)} · {self._format_size(int(batch.bytes_per_second))}/s"
+        return False
 
-        def on_download_complete(source, result, data):
-            try:
-                success = result.propagate_boolean()
-                if success:
-                    item_res, path_res = result.python_result
-                    self._on_download_finished(item_res, True, path_res, None, download_queue_item)
-                else:
-                    error_msg = str(result.python_error)
-                    self._on_download_finished(item, False, None, error_msg, download_queue_item)
-            except Exception as e:
-                self._on_download_finished(item, False, None, str(e), download_queue_item)
+    def _on_batch_download_finished(self, batch, download_queue_item, item, job, error):
+        """Records one finished download of a batch and wraps up the batch after the last one."""
+        self.downloading_paths.discard(job.dest)
+        if error:
+            batch.failed += 1
+            if not isinstance(error, RequestCancelled):
+                print(f"Failed to download {item.wall_id}: {error}")
+        else:
+            batch.succeeded += 1
+            self.downloaded_walls[item.wall_id] = job.dest
+            item.is_downloaded = True
+            item.local_path = str(job.dest)
+            item.emit('download-status-changed', True, str(job.dest))
+        self._on_batch_download_progress(batch, download_queue_item)
+        if batch.done < len(batch.jobs):
+            return False
+
+        for i in range(self.download_popover_store.get_n_items()):
+            if self.download_popover_store.get_item(i) == download_queue_item:
+                self.download_popover_store.remove(i)
+                break
+        self._update_download_ui()
+        if batch.succeeded:
+            self.window.toast_overlay.add_toast(Adw.Toast.new(f"Downloaded {batch.succeeded} of {len(batch.jobs)} wallpapers."))
+            self._load_wallpapers_async()
+        return False
 
-        self.run_in_background(download_worker, on_download_complete, item, wallpaper_dir_str)
+    def _on_download_progress(self, job, download_queue_item):
+        """Shows percentage and transfer rate of a running download in its popover row."""
+        rate = f"{self._format_size(int(job.bytes_per_second))}/s"
+        if job.fraction is not None:
+            download_queue_item.status = f"{int(job.fraction * 100)}% · {rate}"
+        else:
+            download_queue_item.status = f"{self._format_size(job.downloaded)} · {rate}"
+        return False
 
     def _on_apply_downloaded_wallpaper_clicked(self, button, item):
         """Handles the 'Apply' button click for a downloaded online wallpaper."""
@@ -535,6 +706,7 @@ class Manpaper(Adw.Application):
         if item.local_path and os.path.exists(item.local_path):
             try:
                 os.remove(item.local_path)
+                self.downloaded_walls.pop(item.wall_id, None)
                 item.is_downloaded = False
                 item.local_path = None
                 item.emit('download-status-changed', False, "")
@@ -544,6 +716,7 @@ class Manpaper(Adw.Application):
                 self.window.toast_overlay.add_toast(Adw.Toast.new(f"Error deleting wallpaper: {e}"))
         else:
             # It might be already deleted or path is wrong, just reset state
+            self.downloaded_walls.pop(item.wall_id, None)
             item.is_downloaded = False
             item.local_path = None
             item.emit('download-status-changed', False, "")
@@ -551,8 +724,9 @@ class Manpaper(Adw.Application):
 
 
     def _on_download_finished(self, item, success, file_path=None, error_message=None, download_queue_item=None):
-        """Callback after a wallpaper download is finished."""
+        """Callback after a wallpaper download to file_path is finished."""
         print(f"DEBUG: _on_download_finished called for {item.wall_id}, success={success}")
+        self.downloading_paths.discard(file_path)
         # Remove from download popover store
         if download_queue_item:
             for i in range(self.download_popover_store.get_n_items()):
@@ -563,48 +737,48 @@ class Manpaper(Adw.Application):
 
         if success:
             self.window.toast_overlay.add_toast(Adw.Toast.new(f"Wallpaper {item.wall_id} downloaded."))
+            self.downloaded_walls[item.wall_id] = Path(file_path)
             item.is_downloaded = True
             item.local_path = str(file_path)
             item.emit('download-status-changed', True, str(file_path))
             self._load_wallpapers_async() # Reload after callback to ensure UI is updated
-        else:
+        elif error_message:
             self.window.toast_overlay.add_toast(Adw.Toast.new(f"Failed to download {item.wall_id}: {error_message}"))
+        return False
 
     def _load_online_thumbnail(self, item, picture):
-        """Loads an online thumbnail in a background thread."""
-        
+        """
+        Shows an online thumbnail. Textures already in memory are set right away; otherwise
+        the file comes from the online thumbnail cache (downloading or revalidating it
+        if needed) and is decoded in a background thread.
+        Returns a CancelToken to abort the load when the cell is recycled, or None.
+        """
+        key = f"online:{item.wall_id}"
+        texture = self.texture_cache.get(key)
+        if texture:
+            picture.set_paintable(texture)
+            return None
+
+        token = CancelToken()
+
         def load_thumbnail_worker(item_to_load):
-            print(f"Attempting to download thumbnail from: {item_to_load.thumbnail_url}")
-            response = requests.get(item_to_load.thumbnail_url)
-            response.raise_for_status()
-            print(f"Thumbnail downloaded successfully for {item_to_load.wall_id}")
-            
-            # Return the raw bytes, create texture on main thread
-            return item_to_load, response.content
+            path = self.online_thumbnail_cache.fetch(item_to_load.wall_id, item_to_load.thumbnail_url, token)
+            return Gdk.Texture.new_from_filename(str(path))
 
-        def on_load_thumbnail_complete(source, result, data):
-            try:
-                success = result.propagate_boolean()
-                if success:
-                    item_res, content_bytes = result.python_result
-                    
-                    # Create a pixbuf from the downloaded data
-                    bytes_glib = GLib.Bytes.new(content_bytes)
-                    loader = GdkPixbuf.PixbufLoader.new()
-                    loader.write(bytes_glib.get_data())
-                    loader.close()
-                    pixbuf = loader.get_pixbuf()
-                    
-                    # Create a texture from the pixbuf
-                    texture = Gdk.Texture.new_for_pixbuf(pixbuf)
-                    picture.set_paintable(texture)
-                    print(f"Set paintable for {item_res.wall_id}")
-                else:
-                    print(f"Error loading thumbnail for {item.wall_id}: {result.python_error}")
-            except Exception as e:
-                print(f"Error processing thumbnail for {item.wall_id}: {e}")
+        def on_load_thumbnail_complete(texture, error):
+            if isinstance(error, RequestCancelled):
+                return
+            if error:
+                print(f"Error loading thumbnail for {item.wall_id}: {error}")
+                return
+            self.texture_cache.put(key, texture)
+            if not token.cancelled:
+                picture.set_paintable(texture)
 
-        self.run_in_background(load_thumbnail_worker, on_load_thumbnail_complete, item)
+        host = urlsplit(item.thumbnail_url).netloc
+        self.online_engine.submit(self.online_engine.run(load_thumbnail_worker, item, host=host, token=token),
+                                  on_load_thumbnail_complete, group='thumbnails')
+        return token
 
     # _load_online_thumbnail_thread removed as it is now inline
 
@@ -643,6 +817,14 @@ class Manpaper(Adw.Application):
         action_recode.connect("activate", self._on_recode_video_activated)
         self.add_action(action_recode)
 
+        action_seamless_loop = Gio.SimpleAction(name="make_seamless_loop")
+        action_seamless_loop.connect("activate", self._on_make_seamless_loop_activated)
+        self.add_action(action_seamless_loop)
+
+        action_compare_profiles = Gio.SimpleAction(name="compare_recode_profiles")
+        action_compare_profiles.connect("activate", self._on_compare_recode_profiles_activated)
+        self.add_action(action_compare_profiles)
+
         action_add_url = Gio.SimpleAction(name="add_url")
         action_add_url.connect("activate", self._on_add_url_clicked)
         self.add_action(action_add_url)
@@ -659,6 +841,10 @@ class Manpaper(Adw.Application):
         action_show_online_properties.connect("activate", self._on_show_online_properties_activated)
         self.add_action(action_show_online_properties)
 
+        action_download_all_online = Gio.SimpleAction(name="download_all_online_wallpapers")
+        action_download_all_online.connect("activate", self._on_download_all_online_activated)
+        self.add_action(action_download_all_online)
+
         action_delete_online = Gio.SimpleAction(name="delete_online_wallpaper")
         action_delete_online.connect("activate", self._on_delete_online_wallpaper_activated)
         self.add_action(action_delete_online)
@@ -774,7 +960,7 @@ class Manpaper(Adw.Application):
         is_online = stack.get_visible_child_name() == "online"
         # self.purity_revealer.set_reveal_child(is_online) # Removed, now controlled by filter button
         self.window.filter_button_revealer.set_reveal_child(is_online) # Control new filter button
-        self.window.load_more_button_revealer.set_reveal_child(is_online) # Control load more button
+        self._update_load_more_button()
         if is_online:
             self._trigger_online_search(latest=True)
 
@@ -840,6 +1026,7 @@ class Manpaper(Adw.Application):
 
     def _on_key_pressed(self, controller, keyval, keycode, state):
         """Handles global key presses."""
+        self._note_user_interaction()
         if keyval == Gdk.KEY_Escape and self.window.search_button.get_active():
             self.window.search_button.set_active(False)
             return True
@@ -915,46 +1102,82 @@ class Manpaper(Adw.Application):
             print(f"Error creating cropped texture for {path}: {e}")
             return None
 
-    def _get_thumbnail_path_or_trigger_generation(self, item):
+    def _thumbnail_source(self, item):
         """
-        Gets path for a thumbnail. If it's for a video and doesn't exist,
-        it triggers a background generation task.
+        Returns the (source, size, mtime) key the thumbnail manifest tracks an item by.
+        Size and mtime come from the library index; items added outside it are stat-ed once.
         """
-        is_url = isinstance(item.path, str)
-
-        if not is_url and item.path.suffix.lower() in SUPPORTED_STATIC:
-            return str(item.path)
-
-        if is_url or item.path.suffix.lower() in SUPPORTED_LIVE:
-            if is_url:
-                url_hash = hashlib.sha1(item.path.encode()).hexdigest()
-                thumb_path = self.cache_dir / (url_hash + '_thumb.jpg')
-            else:
-                thumb_path = self.cache_dir / (item.path.stem + '_thumb.jpg')
-            
-            if thumb_path.exists():
-                if is_url or thumb_path.stat().st_mtime >= item.path.stat().st_mtime:
-                    return str(thumb_path)
-
-            with self.thumbnail_lock:
-                if str(item.path) in self.thumbnails_in_progress:
-                    return None # Generation already running
-                self.thumbnails_in_progress.add(str(item.path))
+        if isinstance(item.path, str):
+            return item.path, 0, 0
+        if not item.mtime:
+            st = item.path.stat()
+            item.mtime = st.st_mtime_ns
+            item.size = st.st_size
+        return str(item.path), item.size, item.mtime
+
+    def _texture_cache_key(self, item):
+        """Returns the texture_cache key used for an item's preview."""
+        source = item.path if isinstance(item.path, str) else str(item.path)
+        thumb_path = self.thumbnail_manifest.thumb_path_for_source(source)
+        return str(thumb_path) if thumb_path else None
+
+    def _get_thumbnail_path_or_trigger_generation(self, item, priority=PRIORITY_VISIBLE):
+        """
+        Gets path for a thumbnail. If the manifest has none for the item's current
+        size and mtime, it queues generation on the thumbnail scheduler.
+        Returns (thumb_path, None) or (None, job); pass the job to
+        _cancel_thumbnail if the thumbnail is no longer needed.
+        """
+        source, size, mtime = self._thumbnail_source(item)
+        thumb_path = self.thumbnail_manifest.lookup(source, size, mtime)
+        if thumb_path:
+            return str(thumb_path), None
 
+        job, created = self.thumbnail_scheduler.submit(source, self._generate_thumbnail, item, size, mtime, priority=priority)
+        if created:
             self.background_tasks += 1
             GLib.idle_add(self._update_spinner)
-            
-            thread = threading.Thread(target=self._generate_thumbnail_thread, args=(item, thumb_path), daemon=True)
-            thread.start()
-            return None
-        
-        return None
+        return None, job
 
-    def _generate_thumbnail_thread(self, item, thumb_path):
-        """Runs thumbnailer in a background thread."""
+    def _cancel_thumbnail(self, job, priority=PRIORITY_VISIBLE):
+        """Withdraws a thumbnail request, e.g. when its cell scrolled out of view."""
+        if job and self.thumbnail_scheduler.cancel(job, priority):
+            self.background_tasks -= 1
+            self._update_spinner()
+
+    def _generate_static_thumbnail(self, source_path, thumb_path):
+        """Decodes an image at thumbnail scale and stores it as a JPEG."""
+        # new_from_file_at_scale lets the loader downscale while decoding
+        pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_scale(str(source_path), THUMBNAIL_SIZE, THUMBNAIL_SIZE, True)
+        if pixbuf.get_has_alpha():
+            flat = GdkPixbuf.Pixbuf.new(GdkPixbuf.Colorspace.RGB, False, 8, pixbuf.get_width(), pixbuf.get_height())
+            flat.fill(0x000000ff)
+            pixbuf.composite(flat, 0, 0, pixbuf.get_width(), pixbuf.get_height(), 0, 0, 1, 1, GdkPixbuf.InterpType.NEAREST, 255)
+            pixbuf = flat
+        tmp_path = thumb_path.with_name(thumb_path.name + '.part')
+        pixbuf.savev(str(tmp_path), 'jpeg', ['quality'], ['85'])
+        os.replace(tmp_path, thumb_path)
+
+    def _generate_thumbnail(self, item, size, mtime):
+        """
+        Runs the thumbnailer on a thumbnail scheduler worker. Files whose content
+        already has a thumbnail (copies of the same wallpaper) are linked to it instead.
+        """
         try:
             command = []
             is_url = isinstance(item.path, str)
+            if is_url:
+                source = item.path
+                digest = hashlib.sha1(source.encode()).hexdigest()
+            else:
+                source = str(item.path)
+                digest = content_digest(item.path, size)
+            thumb_path = self.thumbnail_manifest.thumb_path(digest)
+
+            if self.thumbnail_manifest.has_thumb(digest) and thumb_path.exists():
+                self.thumbnail_manifest.record(source, size, mtime, digest)
+                GLib.idle_add(self._on_thumbnail_generated, item)
+                return
 
             if is_url:
                 if 'youtube.com' in item.path or 'youtu.be' in item.path:
@@ -972,7 +1195,12 @@ class Manpaper(Adw.Application):
                     ]
                 else:
                     raise NotImplementedError("Thumbnail generation for non-YouTube URLs is not supported yet.")
-            else: # It's a local file
+            elif item.path.suffix.lower() in SUPPORTED_STATIC:
+                self._generate_static_thumbnail(item.path, thumb_path)
+                self.thumbnail_manifest.record(source, size, mtime, digest)
+                GLib.idle_add(self._on_thumbnail_generated, item)
+                return
+            else: # It's a local video
                 command = [
                     'ffmpegthumbnailer', '-i', str(item.path), '-o', str(thumb_path),
                     '-s', '256', '-q', '5'
@@ -981,41 +1209,171 @@ class Manpaper(Adw.Application):
             if not command:
                 raise Exception("Could not determine thumbnailer command.")
 
+            if self.thumbnail_scheduler.in_background_job():
+                command = ['nice', '-n', '19'] + command
+                if is_backend_installed('ionice'):
+                    command = ['ionice', '-c', '3'] + command
+
             subprocess.run(command, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            self.thumbnail_manifest.record(source, size, mtime, digest)
             GLib.idle_add(self._on_thumbnail_generated, item)
 
         except Exception as e:
             name = item.path if isinstance(item.path, str) else item.path.name
             print(f"Thumbnail generation failed for {name}: {e}")
         finally:
-            with self.thumbnail_lock:
-                if str(item.path) in self.thumbnails_in_progress:
-                    self.thumbnails_in_progress.remove(str(item.path))
             self.background_tasks -= 1
             GLib.idle_add(self._update_spinner)
 
+    def _start_thumbnail_prewarm(self):
+        """Queues missing or stale thumbnails for the whole library at background priority."""
+        if self.prewarm_jobs is not None:
+            return # A pass is already running; it picks up new items on the next reload
+        if self.thumbnail_manifest.total_bytes() >= self.thumbnail_cache_max_size * 1024 * 1024:
+            print("Thumbnail cache is full, skipping pre-warm.")
+            return
+        items = [store.get_item(i) for store in (self.static_store, self.live_store) for i in range(store.get_n_items())]
+        self.prewarm_jobs = []
+        self.background_tasks += 1
+        self._update_spinner()
+        threading.Thread(target=self._prewarm_thumbnails_thread, args=(items,), daemon=True).start()
+
+    def _prewarm_thumbnails_thread(self, items):
+        """Checks every item's thumbnail in a background thread and hands the missing ones to the main thread."""
+        missing = []
+        for item in items:
+            try:
+                source, size, mtime = self._thumbnail_source(item)
+            except OSError as e:
+                print(f"Skipping thumbnail pre-warm for {item.path}: {e}")
+                continue
+            if not self.thumbnail_manifest.lookup(source, size, mtime):
+                missing.append(item)
+        GLib.idle_add(self._on_prewarm_queued, missing)
+
+    def _on_prewarm_queued(self, items):
+        """Queues the missing thumbnails and starts reporting pre-warm progress."""
+        jobs = []
+        for item in items:
+            try:
+                _, job = self._get_thumbnail_path_or_trigger_generation(item, priority=PRIORITY_BACKGROUND)
+            except OSError as e:
+                print(f"Skipping thumbnail pre-warm for {item.path}: {e}")
+                continue
+            if job:
+                jobs.append(job)
+        self.prewarm_jobs = jobs
+        self.prewarm_total = len(jobs)
+        if jobs:
+            print(f"Pre-warming {len(jobs)} thumbnails in the background.")
+            GLib.timeout_add(500, self._on_prewarm_tick)
+        else:
+            self._on_prewarm_tick()
+        return False
+
+    def _on_prewarm_tick(self):
+        """
+        Updates the spinner tooltip with pre-warm progress and finishes the pass.
+        Jobs that have not started are dropped once the cache reaches its size limit.
+        """
+        self.prewarm_jobs = [job for job in self.prewarm_jobs if self.thumbnail_scheduler.is_pending(job)]
+        if self.prewarm_jobs and self.thumbnail_manifest.total_bytes() >= self.thumbnail_cache_max_size * 1024 * 1024:
+            print("Thumbnail cache is full, stopping pre-warm.")
+            for job in self.prewarm_jobs:
+                self._cancel_thumbnail(job, PRIORITY_BACKGROUND)
+            self.prewarm_jobs = []
+        if self.prewarm_jobs:
+            done = self.prewarm_total - len(self.prewarm_jobs)
+            self.spinner.set_tooltip_text(f"Generating thumbnails: {done} of {self.prewarm_total}")
+            return GLib.SOURCE_CONTINUE
+
+        self.prewarm_jobs = None
+        self.spinner.set_tooltip_text(None)
+        self.background_tasks -= 1
+        self._update_spinner()
+        self._update_thumbnail_cache_size_label()
+        return GLib.SOURCE_REMOVE
+
+    def _start_thumbnail_gc(self, then_prewarm=False):
+        """
+        Trims the thumbnail cache to its size limit and drops orphans in a background thread.
+        Orphans are only dropped while the wallpaper directory can be read and is not empty.
+        """
+        if self.thumbnail_gc_running:
+            return
+        self.thumbnail_gc_running = True
+        live_sources = None
+        wallpaper_dir = self.settings.get_string('wallpaper-dir')
+        if wallpaper_dir and Path(wallpaper_dir).is_dir() and self.static_store.get_n_items() + self.live_store.get_n_items():
+            live_sources = {}
+            for store in (self.static_store, self.live_store):
+                for i in range(store.get_n_items()):
+                    item = store.get_item(i)
+                    if isinstance(item.path, str):
+                        live_sources[item.path] = (0, 0)
+                    else:
+                        live_sources[str(item.path)] = (item.size, item.mtime) if item.mtime else None
+        else:
+            print("Wallpaper directory is not available, keeping thumbnails of missing files.")
+        max_bytes = self.thumbnail_cache_max_size * 1024 * 1024
+        self.background_tasks += 1
+        self._update_spinner()
+        threading.Thread(target=self._thumbnail_gc_thread, args=(live_sources, max_bytes, then_prewarm), daemon=True).start()
+
+    def _thumbnail_gc_thread(self, live_sources, max_bytes, then_prewarm):
+        try:
+            removed, freed = self.thumbnail_manifest.collect_garbage(live_sources, max_bytes)
+        except Exception as e:
+            print(f"Thumbnail cache cleanup failed: {e}")
+            removed, freed = 0, 0
+        GLib.idle_add(self._on_thumbnail_gc_finished, removed, freed, then_prewarm)
+
+    def _on_thumbnail_gc_finished(self, removed, freed, then_prewarm):
+        self.thumbnail_gc_running = False
+        self.thumbnail_gc_done = True
+        if removed:
+            print(f"Thumbnail cache cleanup removed {removed} files ({self._format_size(freed)}).")
+        self.background_tasks -= 1
+        self._update_spinner()
+        self._update_thumbnail_cache_size_label()
+        if then_prewarm:
+            self._start_thumbnail_prewarm()
+        return False
+
+    def _update_thumbnail_cache_size_label(self):
+        """Shows the current thumbnail cache size in preferences."""
+        if self.prefs_window.cache_size_row:
+            used = self._format_size(self.thumbnail_manifest.total_bytes())
+            self.prefs_window.cache_size_row.set_subtitle(f"{used} of {self.thumbnail_cache_max_size} MB used")
+
+    def _note_user_interaction(self):
+        """Pauses background thumbnail work while the user scrolls or types."""
+        self.thumbnail_scheduler.hold_background(PREWARM_IDLE_SECONDS)
+
+    def _on_thumbnail_unreadable(self, item):
+        """
+        Called when a cached thumbnail could not be decoded, e.g. because it was deleted
+        outside the app. Forgets it and generates it again, once per source.
+        """
+        source = item.path if isinstance(item.path, str) else str(item.path)
+        if source in self.thumbnail_retried:
+            return
+        self.thumbnail_retried.add(source)
+        self.thumbnail_manifest.forget(source)
+        item.emit('thumbnail-changed')
+
     def _on_thumbnail_generated(self, item):
         """Callback after a thumbnail is created to refresh the specific item."""
-        target_path = item.path
-        for i in range(self.live_store.get_n_items()):
-            current_item = self.live_store.get_item(i)
-            if current_item and current_item.path == target_path:
-                # Re-fetch the item from the store to ensure we have the latest version,
-                # then update its title property if it exists in the bookmarks.
-                live_item = self.live_store.get_item(i)
-                try:
-                    bookmarks_str = self.settings.get_string('video-bookmarks')
-                    bookmarks = json.loads(bookmarks_str)
-                    for b in bookmarks:
-                        if b.get('url') == live_item.path:
-                            live_item.props.title = b.get('title')
-                            break
-                except (json.JSONDecodeError, TypeError):
-                    pass
-                # Splicing with a new item is a robust way to signal a change
-                new_item = WallpaperItem(path=live_item.path, title=live_item.title)
-                self.live_store.splice(i, 1, [new_item])
-                break
+        if isinstance(item.path, str):
+            try:
+                bookmarks = json.loads(self.settings.get_string('video-bookmarks'))
+                for b in bookmarks:
+                    if b.get('url') == item.path:
+                        item.props.title = b.get('title')
+                        break
+            except (json.JSONDecodeError, TypeError):
+                pass
+        item.emit('thumbnail-changed')
         return False
 
     def _load_wallpapers_async(self):
@@ -1028,40 +1386,227 @@ class Manpaper(Adw.Application):
         """Synchronously loads wallpaper paths from the directory."""
         wallpaper_dir = self.settings.get_string('wallpaper-dir')
         if not wallpaper_dir:
-            GLib.idle_add(self._on_wallpapers_loaded, [], [], [])
+            GLib.idle_add(self.library_watcher.stop)
+            GLib.idle_add(self._on_wallpapers_loaded, [], [], [], {})
             return
         root = Path(wallpaper_dir)
         if not root.is_dir():
-            GLib.idle_add(self._on_wallpapers_loaded, [], [], [])
+            GLib.idle_add(self.library_watcher.stop)
+            GLib.idle_add(self._on_wallpapers_loaded, [], [], [], {})
             return
-        static_paths = [p for p in root.rglob('*') if p.suffix.lower() in SUPPORTED_STATIC]
-        live_paths = [p for p in root.rglob('*') if p.suffix.lower() in SUPPORTED_LIVE]
+        try:
+            static_entries, live_entries = self.library_index.scan(root)
+        except Exception as e: # The stores must still be updated, or the spinner never stops
+            print(f"Could not scan wallpaper directory {root}: {e}")
+            static_entries, live_entries = [], []
+        GLib.idle_add(self.library_watcher.watch, root, self.library_index.directories())
         video_bookmarks_str = self.settings.get_string('video-bookmarks')
         try:
             video_bookmarks = json.loads(video_bookmarks_str)
         except json.JSONDecodeError:
             video_bookmarks = []
 
-        GLib.idle_add(self._on_wallpapers_loaded, static_paths, live_paths, video_bookmarks)
+        downloaded_walls = self._downloaded_walls_from_entries(root, static_entries)
+        GLib.idle_add(self._on_wallpapers_loaded, static_entries, live_entries, video_bookmarks, downloaded_walls)
 
-    def _on_wallpapers_loaded(self, static_paths, live_paths, video_bookmarks):
+    def _on_wallpapers_loaded(self, static_entries, live_entries, video_bookmarks, downloaded_walls):
         """Updates the stores after wallpapers have been loaded."""
-        self.texture_cache.clear()
+        self.downloaded_walls = downloaded_walls
+        static_rows = [(e.path, e.mtime, e.size, None) for e in static_entries]
+        changed = self._sync_store(self.static_store, static_rows)
+        print(f"Static store synced with {len(static_rows)} items ({changed} changed).")
+
+        live_rows = [(e.path, e.mtime, e.size, None) for e in live_entries]
+        live_rows += [(b.get('url'), 0, 0, b.get('title')) for b in video_bookmarks]
+        changed = self._sync_store(self.live_store, live_rows)
+        print(f"Live store synced with {len(live_rows)} items ({changed} changed).")
+        stats = self.texture_cache.stats()
+        print(f"Texture cache: {stats['entries']} textures, {self._format_size(stats['bytes'])} of {self._format_size(stats['budget'])}, "
+              f"{stats['hits']} hits, {stats['misses']} misses, {stats['evictions']} evictions.")
+
+        self._refresh_live_variants()
+        self.background_tasks -= 1
+        self._update_spinner()
+        self._update_status_page_visibility()
+        self._start_library_refresh(static_entries or live_entries)
+        if self.thumbnail_gc_done:
+            self._start_thumbnail_prewarm()
+        else:
+            self._start_thumbnail_gc(then_prewarm=True)
+        return False
+
+    def _start_library_refresh(self, loaded):
+        """
+        Re-stats every library file once per session and wallpaper directory in a
+        background thread, to catch files edited in place while the app was closed.
+        Later edits arrive through the library watcher.
+        """
+        wallpaper_dir = self.settings.get_string('wallpaper-dir')
+        if not loaded or not wallpaper_dir or self.library_refreshed_root == wallpaper_dir:
+            return
+        self.library_refreshed_root = wallpaper_dir
+        self.background_tasks += 1
+        self._update_spinner()
+        threading.Thread(target=self._refresh_library_files_thread, daemon=True).start()
+
+    def _refresh_library_files_thread(self):
+        try:
+            changed, gone = self.library_index.refresh_files()
+        except Exception as e:
+            print(f"Could not refresh library files: {e}")
+            changed, gone = {'static': [], 'live': []}, set()
+        if changed['static'] or changed['live'] or gone:
+            print(f"Library refresh found {len(changed['static']) + len(changed['live'])} changed and {len(gone)} missing files.")
+        GLib.idle_add(self._on_library_changes_applied, changed, gone, [])
+
+    def _on_library_changed(self, added, removed):
+        """Called by the library watcher with a batch of added and removed paths."""
+        self.background_tasks += 1
+        self._update_spinner()
+        threading.Thread(target=self._apply_library_changes_sync, args=(added, removed), daemon=True).start()
 
-        static_items = [WallpaperItem(p) for p in static_paths]
-        self.static_store.splice(0, self.static_store.get_n_items(), static_items)
-        print(f"Static store updated with {len(static_items)} items.")
+    def _apply_library_changes_sync(self, added, removed):
+        """Stats the changed paths and updates the library index in a background thread."""
+        try:
+            added_entries, removed_paths, new_dirs = self.library_index.apply_changes(added, removed)
+        except Exception as e:
+            print(f"Could not apply library changes: {e}")
+            added_entries, removed_paths, new_dirs = {'static': [], 'live': []}, set(), []
+        GLib.idle_add(self._on_library_changes_applied, added_entries, removed_paths, new_dirs)
 
-        live_items = [WallpaperItem(p) for p in live_paths]
-        url_items = [WallpaperItem(path=b.get('url'), title=b.get('title')) for b in video_bookmarks]
-        self.live_store.splice(0, self.live_store.get_n_items(), live_items + url_items)
-        print(f"Live store updated with {len(live_items) + len(url_items)} items.")
+    def _on_library_changes_applied(self, added_entries, removed_paths, new_dirs):
+        """Pushes watcher changes into the stores."""
+        self.library_watcher.watch_dirs(new_dirs)
+        wallpaper_dir = self.settings.get_string('wallpaper-dir')
+        if wallpaper_dir:
+            root = Path(wallpaper_dir)
+            for path in map(Path, removed_paths):
+                if self.downloaded_walls.get(path.stem) == path:
+                    del self.downloaded_walls[path.stem]
+            self.downloaded_walls.update(self._downloaded_walls_from_entries(root, added_entries['static']))
+        for store, kind in [(self.static_store, 'static'), (self.live_store, 'live')]:
+            if added_entries[kind] or removed_paths:
+                self._merge_library_changes(store, added_entries[kind], removed_paths)
+        if added_entries['live'] or removed_paths:
+            self._refresh_live_variants()
 
         self.background_tasks -= 1
         self._update_spinner()
         self._update_status_page_visibility()
         return False
 
+    def _merge_library_changes(self, store, added_entries, removed_paths):
+        """
+        Applies added/removed files to a sorted store in place. Each path is located
+        with bisect and only the affected positions are spliced, adjacent ones together.
+        """
+        positions = set()
+        for path in removed_paths:
+            position, found = self._store_position(store, Path(path))
+            if found:
+                positions.add(position)
+        positions = sorted(positions)
+        while positions:
+            end = positions.pop() + 1
+            start = end - 1
+            while positions and positions[-1] == start - 1:
+                start = positions.pop()
+            for position in range(start, end):
+                self._forget_item_texture(store.get_item(position))
+            store.splice(start, end - start, [])
+
+        run_position, run = 0, []
+        for entry in sorted(added_entries, key=lambda e: self._store_order(e.path)):
+            position, found = self._store_position(store, entry.path)
+            if run and position != run_position:
+                store.splice(run_position, 0, run)
+                position += len(run)
+                run = []
+            if found:
+                self._update_item(store.get_item(position), entry.mtime, entry.size, None)
+                continue
+            run_position = position
+            run.append(WallpaperItem(entry.path, mtime=entry.mtime, size=entry.size))
+        if run:
+            store.splice(run_position, 0, run)
+
+    def _store_position(self, store, path):
+        """Bisects a sorted store for path. Returns (position, found)."""
+        keys = _StoreOrderKeys(store, self._store_order)
+        key = self._store_order(path)
+        position = bisect.bisect_left(keys, key)
+        return position, position < len(keys) and keys[position] == key
+
+    def _insert_item(self, store, item):
+        """Inserts item at its sorted position, or refreshes the item already there."""
+        position, found = self._store_position(store, item.path)
+        if found:
+            self._update_item(store.get_item(position), item.mtime, item.size, item.title)
+        else:
+            store.insert(position, item)
+
+    def _update_item(self, item, mtime, size, title):
+        """Refreshes a kept item whose file changed. Returns True if anything changed."""
+        if item.mtime == mtime and item.size == size and (title is None or item.title == title):
+            return False
+        self._forget_item_texture(item)
+        item.mtime = mtime
+        item.size = size
+        if title is not None:
+            item.title = title
+        item.emit('thumbnail-changed')
+        return True
+
+    @staticmethod
+    def _store_order(path):
+        """Sort key of store items: local files by path, then URL bookmarks."""
+        return (isinstance(path, str), str(path))
+
+    def _sync_store(self, store, rows):
+        """
+        Brings a store in line with rows of (path, mtime, size, title) using minimal splices.
+        Both are in _store_order, so one linear merge finds the runs that differ and each
+        run becomes a single splice. Unchanged WallpaperItems are kept along with their
+        cached textures. Returns the number of positions that were inserted, removed or updated.
+        """
+        current = [store.get_item(i) for i in range(store.get_n_items())]
+        runs = [] # (position, items removed, rows inserted)
+        changed = 0
+        i = j = 0
+        while i < len(current) or j < len(rows):
+            if i < len(current) and j < len(rows) and current[i].path == rows[j][0]:
+                _, mtime, size, title = rows[j]
+                if self._update_item(current[i], mtime, size, title):
+                    changed += 1
+                i += 1
+                j += 1
+                continue
+
+            run_i, run_j = i, j
+            while i < len(current) or j < len(rows):
+                if i < len(current) and j < len(rows) and current[i].path == rows[j][0]:
+                    break
+                if j == len(rows) or (i < len(current) and self._store_order(current[i].path) < self._store_order(rows[j][0])):
+                    i += 1
+                else:
+                    j += 1
+            runs.append((run_i, i - run_i, rows[run_j:j]))
+
+        # Apply from the end so positions of earlier runs stay valid
+        for position, n_removed, new_rows in reversed(runs):
+            for item in current[position:position + n_removed]:
+                self._forget_item_texture(item)
+            new_items = [WallpaperItem(path, title=title, mtime=mtime, size=size) for path, mtime, size, title in new_rows]
+            store.splice(position, n_removed, new_items)
+            changed += max(n_removed, len(new_rows))
+        return changed
+
+    def _forget_item_texture(self, item):
+        """Drops the cached preview texture of an item that was removed or modified."""
+        key = self._texture_cache_key(item)
+        if key:
+            self.texture_cache.pop(key, None)
+
     def _on_wallpaper_activated(self, grid, position):
         """Sets the selected wallpaper."""
         item = grid.get_model().get_item(position)
@@ -1220,9 +1765,39 @@ class Manpaper(Adw.Application):
 
     def _on_load_more_online_wallpapers_clicked(self, button):
         """Loads the next page of online wallpapers."""
+        if self.online_page_loading or not self._has_more_online_pages():
+            return
         self.online_current_page += 1
         self._trigger_online_search(latest=False, page=self.online_current_page)
 
+    def _has_more_online_pages(self):
+        """False once the last page reported by the API has been loaded."""
+        return self.online_last_page is None or self.online_current_page < self.online_last_page
+
+    def _update_load_more_button(self):
+        is_online = self.window.view_stack.get_visible_child_name() == "online"
+        self.window.load_more_button_revealer.set_reveal_child(is_online and self._has_more_online_pages())
+
+    def _on_online_scroll_changed(self, adjustment):
+        """Fetches the next results page once the online grid is scrolled close to its end."""
+        if self.online_page_loading or not self.online_store.get_n_items() or not self._has_more_online_pages():
+            return
+        remaining = adjustment.get_upper() - adjustment.get_value() - adjustment.get_page_size()
+        if remaining <= adjustment.get_page_size() * ONLINE_PREFETCH_SCREENS:
+            self._on_load_more_online_wallpapers_clicked(None)
+
+    def _prefetch_online_thumbnails(self, items):
+        """Downloads thumbnails of freshly loaded results into the disk cache before they are scrolled to."""
+        def on_prefetched(result, error):
+            if error and not isinstance(error, RequestCancelled):
+                print(f"Could not prefetch thumbnail: {error}")
+
+        token = self.online_search_token
+        for item in items:
+            host = urlsplit(item.thumbnail_url).netloc
+            self.online_engine.submit(self.online_engine.run(self.online_thumbnail_cache.fetch, item.wall_id, item.thumbnail_url, token, host=host, token=token),
+                                      on_prefetched, group='prefetch')
+
     def _on_list_item_right_clicked(self, gesture, n_press, x, y, list_item):
         """Handles right-click on a wallpaper list item."""
         item = list_item.get_item()
@@ -1231,23 +1806,23 @@ class Manpaper(Adw.Application):
         self.right_clicked_item = item
         menu = Gio.Menu()
         if isinstance(item.path, Path) and item.path.suffix.lower() in SUPPORTED_LIVE:
-            # Only show recode option if video resolution exceeds display resolution
-            show_recode = False
-            try:
-                monitor_width, monitor_height = get_monitor_resolution(self.window)
-                if monitor_width and monitor_height:
-                    cmd = ['ffprobe', '-v', 'error', '-select_streams', 'v:0', '-show_entries', 'stream=width,height', '-of', 'csv=s=x:p=0', str(item.path)]
-                    result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-                    video_width, video_height = map(int, result.stdout.strip().split('x'))
-                    if video_width > monitor_width or video_height > monitor_height:
-                        show_recode = True
-            except (FileNotFoundError, subprocess.CalledProcessError, ValueError) as e:
-                # If we can't determine resolution, show the option to be safe
-                print(f"Could not determine video resolution for {item.path.name}: {e}")
-                show_recode = True
+            # Only show recode option if playback would get cheaper
+            show_recode = True
+            monitor_width, monitor_height = get_monitor_resolution(self.window)
+            if monitor_width and monitor_height:
+                info = probe_video(item.path)
+                if info:
+                    show_recode = self._recode_would_help(info, monitor_width, monitor_height)
+                else:
+                    # If we can't read the video, show the option to be safe
+                    print(f"Could not determine video properties for {item.path.name}")
             
             if show_recode:
-                menu.append("Recode to display resolution", "app.recode_video")
+                menu.append("Recode for playback", "app.recode_video")
+            if item.path.suffix.lower() != '.gif':
+                if item.path.parent.name != 'recoded':
+                    menu.append("Make seamless loop", "app.make_seamless_loop")
+                menu.append("Compare recode profiles", "app.compare_recode_profiles")
         menu.append("Delete", "app.delete_wallpaper")
         menu.append("Properties", "app.show_properties")
         popover = Gtk.PopoverMenu.new_from_model(menu)
@@ -1262,6 +1837,7 @@ class Manpaper(Adw.Application):
         self.right_clicked_item = item
         menu = Gio.Menu()
         menu.append("Download", "app.download_online_wallpaper")
+        menu.append("Download All Results", "app.download_all_online_wallpapers")
         menu.append("Properties", "app.show_online_properties")
         if item.is_downloaded:
             menu.append("Delete", "app.delete_online_wallpaper")
@@ -1280,9 +1856,23 @@ class Manpaper(Adw.Application):
         if not self.right_clicked_item: return
         item = self.right_clicked_item
 
-        # Wrap the image loading in a lambda to start the thread
         def load_image(item, picture):
-            threading.Thread(target=self._load_full_online_image_thread, args=(item, picture), daemon=True).start()
+            width, height = picture.get_size_request()
+            scale = picture.get_scale_factor()
+            self._trim_online_previews()
+            preview = OnlinePreview(item.full_url, self._online_preview_path(item),
+                                    width * scale, height * scale, picture.set_paintable)
+            self.online_previews[item.wall_id] = preview
+
+            def on_loaded(complete, error):
+                if self.online_previews.get(item.wall_id) is preview:
+                    del self.online_previews[item.wall_id]
+                if error and not isinstance(error, RequestCancelled):
+                    print(f"Error loading full image for {item.wall_id}: {error}")
+
+            host = urlsplit(item.full_url).netloc
+            self.online_engine.submit(self.online_engine.run(preview.run, host=host, token=preview.token), on_loaded, group='preview')
+            return preview
         
         dialog = create_online_properties_dialog(
             self.window,
@@ -1291,29 +1881,15 @@ class Manpaper(Adw.Application):
         )
         dialog.present(self.window)
 
-    def _load_full_online_image_thread(self, item, picture_widget):
-        """Loads the full online image in a background thread for the properties dialog."""
+    def _trim_online_previews(self):
+        """Keeps only the most recently streamed full-size previews on disk."""
         try:
-            print(f"Attempting to download full image from: {item.full_url}")
-            response = requests.get(item.full_url)
-            response.raise_for_status()
-            print(f"Full image downloaded successfully for {item.wall_id}")
-            
-            bytes = GLib.Bytes.new(response.content)
-            loader = GdkPixbuf.PixbufLoader.new()
-            loader.write(bytes.get_data())
-            loader.close()
-            pixbuf = loader.get_pixbuf()
-            print(f"Pixbuf created for full image {item.wall_id}")
-
-            texture = Gdk.Texture.new_for_pixbuf(pixbuf)
-            print(f"Texture created for full image {item.wall_id}")
-            
-            GLib.idle_add(picture_widget.set_paintable, texture)
-            print(f"Set paintable for full image {item.wall_id}")
-
-        except (requests.exceptions.RequestException, GLib.Error) as e:
-            print(f"Error loading full image for {item.wall_id}: {e}")
+            files = sorted(self.online_preview_dir.iterdir(), key=lambda f: f.stat().st_mtime, reverse=True)
+        except OSError:
+            return
+        for f in files[ONLINE_PREVIEW_CACHE_FILES:]:
+            if f.stem not in self.online_previews:
+                f.unlink(missing_ok=True)
 
     def _on_delete_online_wallpaper_activated(self, action, param):
         """Handles the 'Delete' action for a downloaded online wallpaper."""
@@ -1342,6 +1918,7 @@ class Manpaper(Adw.Application):
             if item.local_path and os.path.exists(item.local_path):
                 try:
                     os.remove(item.local_path)
+                    self.downloaded_walls.pop(item.wall_id, None)
                     self.window.toast_overlay.add_toast(Adw.Toast.new(f"Deleted {item.wall_id}."))
                     item.is_downloaded = False
                     item.local_path = None
@@ -1351,27 +1928,42 @@ class Manpaper(Adw.Application):
                     self.window.toast_overlay.add_toast(Adw.Toast.new(f"Error deleting file: {e}"))
 
     def _update_recode_ui(self):
-        """Updates the spinner and popover based on the recode queue and download tasks."""
-        with self.recode_lock:
-            # Check if there are any active recode or download tasks
-            is_active = bool(self.recode_currently_running or self.recode_queue)
-            print(f"_update_recode_ui: is_active={is_active}")
-            self.window.recode_revealer_container.set_visible(is_active)
-            revealer = self.window.recode_revealer_container.get_first_child()
-            if revealer:
-                revealer.set_reveal_child(is_active)
-            self.window.recode_spinner.spinning = is_active
-            print(f"_update_recode_ui: recode_spinner.spinning={self.window.recode_spinner.spinning}")
-            
-            # Clear and repopulate the popover store
-            self.recode_popover_store.remove_all()
-            self.recode_popover_store.splice(0, 0, []) # Add this line to force a refresh
-            if self.recode_currently_running:
-                item = RecodeQueueItem(f"{self.recode_currently_running.path.name}", "Running", self.recode_currently_running)
-                self.recode_popover_store.append(item)
-            for item_in_queue in self.recode_queue:
-                item = RecodeQueueItem(f"{item_in_queue.path.name}", "Queued", item_in_queue)
-                self.recode_popover_store.append(item)
+        """Updates the spinner and popover with one row per busy recode worker, then the queue."""
+        running, queued = self.recode_scheduler.snapshot()
+        is_active = bool(running or queued)
+        self.window.recode_revealer_container.set_visible(is_active)
+        revealer = self.window.recode_revealer_container.get_first_child()
+        if revealer:
+            revealer.set_reveal_child(is_active)
+        self.window.recode_spinner.spinning = is_active
+
+        rows = {}
+        for job in running + queued:
+            row = self.recode_rows.get(job) or RecodeQueueItem(self._recode_title(job), "", job.item, job)
+            row.status = self._recode_status(job)
+            rows[job] = row
+        self.recode_rows = rows
+        self.recode_popover_store.splice(0, self.recode_popover_store.get_n_items(), list(rows.values()))
+
+    def _recode_title(self, job):
+        """Popover title of a recode job."""
+        if job.kind == 'compare':
+            return f"Comparing profiles: {job.item.path.name}"
+        if job.kind == 'loop':
+            return f"Seamless loop: {job.item.path.name}"
+        return job.item.path.name
+
+    def _recode_status(self, job):
+        """Popover status line of a recode job."""
+        if not job.running:
+            return "Queued"
+        return f"Worker {job.worker + 1} · {job.progress.describe() if job.progress else 'Starting'}"
+
+    def _on_recode_progress(self, job):
+        """Shows the latest ffmpeg progress of a running recode in its popover row."""
+        row = self.recode_rows.get(job)
+        if row:
+            row.status = self._recode_status(job)
 
     def _update_download_ui(self):
         """Updates the spinner and popover based on the download tasks."""
@@ -1382,26 +1974,20 @@ class Manpaper(Adw.Application):
             revealer.set_reveal_child(is_active)
         self.window.download_spinner.spinning = is_active
 
-    def _on_stop_one_recode_clicked(self, button, item_to_stop):
+    def _on_stop_one_recode_clicked(self, button, queue_item):
         """Stops a single recode job from the queue or the running process."""
-        with self.recode_lock:
-            if self.recode_currently_running == item_to_stop:
-                if self.recode_process:
-                    try:
-                        self.recode_process.terminate()
-                        self.window.toast_overlay.add_toast(Adw.Toast.new(f"Stopping recode for: {item_to_stop.path.name}"))
-                    except ProcessLookupError: pass 
-                self.recode_currently_running = None
-                GLib.idle_add(self._start_next_recode_if_possible)
-            elif item_to_stop in self.recode_queue:
-                self.recode_queue.remove(item_to_stop)
-                self.window.toast_overlay.add_toast(Adw.Toast.new(f"Removed from queue: {item_to_stop.path.name}"))
-        GLib.idle_add(self._update_recode_ui)
+        job = queue_item.job
+        self.recode_scheduler.cancel(job)
+        if job.running:
+            self.window.toast_overlay.add_toast(Adw.Toast.new(f"Stopping recode for: {job.item.path.name}"))
+        else:
+            self.window.toast_overlay.add_toast(Adw.Toast.new(f"Removed from queue: {job.item.path.name}"))
 
     def _on_stop_one_download_clicked(self, button, item_to_stop):
         """Stops a single download job from the queue."""
-        # We don't have direct control over running download threads started by requests.get
-        # So, we just remove the item from the UI.
+        # The partial file is kept, so downloading the same wallpaper again resumes it
+        if item_to_stop.job:
+            item_to_stop.job.cancel()
         for i in range(self.download_popover_store.get_n_items()):
             if self.download_popover_store.get_item(i) == item_to_stop:
                 self.download_popover_store.remove(i)
@@ -1410,106 +1996,173 @@ class Manpaper(Adw.Application):
         GLib.idle_add(self._update_download_ui)
 
     def _on_stop_all_recodes_clicked(self, button):
-        """Stops the running recode process and clears the queue."""
-        with self.recode_lock:
-            self.recode_queue.clear()
-            if self.recode_currently_running:
-                if self.recode_process:
-                    try: self.recode_process.terminate()
-                    except ProcessLookupError: pass
-                self.recode_currently_running = None
+        """Stops the running recode processes and clears the queue."""
+        self.recode_scheduler.cancel_all()
         self.window.toast_overlay.add_toast(Adw.Toast.new("All recode jobs stopped."))
         self.window.recode_button.get_popover().popdown()
-        GLib.idle_add(self._update_recode_ui)
 
     def _on_stop_all_downloads_clicked(self, button):
         """Stops all active downloads and clears the download queue."""
-        # We don't have direct control over running download threads started by requests.get
-        # For now, just clear the queue
+        for i in range(self.download_popover_store.get_n_items()):
+            job = self.download_popover_store.get_item(i).job
+            if job:
+                job.cancel()
         self.download_popover_store.remove_all() # This will clear the displayed items
-        # We don't have direct control over running download threads started by requests.get
-        # So, we just clear the UI and let the threads finish in the background.
         self.window.toast_overlay.add_toast(Adw.Toast.new("All download jobs stopped."))
         self.window.download_button.get_popover().popdown()
         GLib.idle_add(self._update_download_ui)
     
-    def _start_next_recode_if_possible(self):
-        """Checks the queue and starts the next recode job if the worker is free."""
-        with self.recode_lock:
-            if self.recode_currently_running or not self.recode_queue: return
-            item_to_process = self.recode_queue.pop(0)
-            self.recode_currently_running = item_to_process
-            GLib.idle_add(self._update_recode_ui)
-            thread = threading.Thread(target=self._recode_video_thread, args=(item_to_process, self.window), daemon=True)
-            thread.start()
-
-    def _perform_recode(self, item, window):
-        """Performs the ffmpeg recoding. Returns (success, error_message)."""
-        width, height = get_monitor_resolution(window)
+    def _perform_recode(self, job):
+        """Performs the ffmpeg recoding on a recode worker. Returns (success, error_message)."""
+        item = job.item
+        width, height = get_monitor_resolution(self.window)
         if not width or not height:
             return False, "Could not determine display resolution."
-        
+        video_filter = f'scale={width}:{height}:force_original_aspect_ratio=decrease,pad={width}:{height}:(ow-iw)/2:(oh-ih)/2'
+        profile = RECODE_PROFILES.get(self.recode_profile, RECODE_PROFILES[DEFAULT_RECODE_PROFILE])
+
+        if job.kind == 'compare':
+            try:
+                job.result, error_message = compare_profiles(self.recode_scheduler, job, item.path, video_filter,
+                                                             self.cache_dir.parent / 'recode_samples')
+            except FileNotFoundError:
+                return False, "ffmpeg command not found. Is it installed?"
+            return job.result is not None, error_message
+
+        if job.kind == 'loop':
+            return self._perform_loop_recode(job, video_filter, profile)
+
         recoded_dir = item.path.parent / 'recoded'
         recoded_dir.mkdir(parents=True, exist_ok=True)
         
         input_path = str(item.path)
         output_path = str(recoded_dir / f"{item.path.stem}_recoded{item.path.suffix}")
-        
-        command = ['ffmpeg', '-i', input_path, '-vf', f'scale={width}:{height}:force_original_aspect_ratio=decrease,pad={width}:{height}:(ow-iw)/2:(oh-ih)/2', '-c:a', 'copy', '-y', output_path]
+
+        info = probe_video(item.path)
+        fps_cap = self._recode_fps_cap()
+        if info and info.fps > fps_cap * RECODE_FPS_TOLERANCE:
+            video_filter += f',fps={fps_cap}'
+        # A muted mpv still demuxes and decodes the audio track
+        audio_args = ['-c:a', 'copy'] if self.enable_video_sound else ['-an']
+        video_args = ['-vf', video_filter, *profile.output_args(item.path.suffix)]
+        if (info and info.width <= width and info.height <= height and info.fps <= fps_cap * RECODE_FPS_TOLERANCE
+                and info.has_audio and not self.enable_video_sound):
+            # Only the audio has to go: remux, keeping the video stream as it is
+            video_args = ['-c:v', 'copy']
+
+        command = ['-i', input_path, *video_args, *audio_args, '-threads', str(job.threads), '-y', output_path]
+        try:
+            return self.recode_scheduler.run_ffmpeg(job, command, input_path, probe_duration(item.path))
+        except FileNotFoundError:
+            return False, "ffmpeg command not found. Is it installed?"
+        except Exception as e:
+            return False, str(e)
+
+    def _perform_loop_recode(self, job, video_filter, profile):
+        """
+        Encodes a seamless loop of a video to recoded/<stem>_loop: cut on a keyframe,
+        optionally crossfaded into its start, with closed GOPs so mpv can loop without
+        re-seeking. Scaled and capped like a normal recode. Returns (success, error_message).
+        """
+        item = job.item
+        duration = probe_duration(item.path)
+        info = probe_video(item.path)
+        if not duration or not info:
+            return False, "Could not read the video."
+        end = loop_end(probe_keyframes(item.path), duration)
+        crossfade = min(self.loop_crossfade, end / 3) # Needs a body longer than the blended head
+
+        fps_cap = self._recode_fps_cap()
+        if info.fps > fps_cap * RECODE_FPS_TOLERANCE:
+            video_filter += f',fps={fps_cap}'
+        with_audio = info.has_audio and self.enable_video_sound
+
+        recoded_dir = item.path.parent / 'recoded'
+        recoded_dir.mkdir(parents=True, exist_ok=True)
+        output_path = str(recoded_dir / f"{item.path.stem}_loop{item.path.suffix}")
+        command = ['-i', str(item.path), '-filter_complex', loop_filter_graph(end, crossfade, video_filter, with_audio), '-map', '[v]']
+        command += ['-map', '[a]', '-c:a', 'aac'] if with_audio else ['-an']
+        command += [*profile.output_args(item.path.suffix, closed_gop=True), '-threads', str(job.threads), '-y', output_path]
         try:
-            process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, errors='replace')
-            with self.recode_lock: self.recode_process = process
-            stdout, stderr = process.communicate()
-            return_code = process.wait()
-            with self.recode_lock: self.recode_process = None
-            if return_code != 0:
-                return False, stderr or "Process was terminated or failed."
-            return True, None
+            return self.recode_scheduler.run_ffmpeg(job, command, str(item.path), end - crossfade, input_duration=duration)
         except FileNotFoundError:
             return False, "ffmpeg command not found. Is it installed?"
         except Exception as e:
-            with self.recode_lock: self.recode_process = None
             return False, str(e)
 
+    def _on_make_seamless_loop_activated(self, action, param):
+        """Queues a seamless-loop recode of a video."""
+        if not self.right_clicked_item: return
+        item = self.right_clicked_item
+        if not self.recode_scheduler.submit(item, kind='loop'):
+            self.window.toast_overlay.add_toast(Adw.Toast.new(f"A loop of '{item.path.name}' is already in the queue."))
+            return
+        self.window.toast_overlay.add_toast(Adw.Toast.new(f"Added a seamless loop of '{item.path.name}' to the recode queue."))
+
+    def _recode_fps_cap(self):
+        """Highest frame rate recoded videos keep: the chosen cap, or the monitor's refresh rate."""
+        if self.recode_max_fps:
+            return self.recode_max_fps
+        if self.monitor_refresh_rate is None:
+            self.monitor_refresh_rate = get_monitor_refresh_rate() # Runs hyprctl or wlr-randr
+        return self.monitor_refresh_rate
+
+    def _on_monitors_changed(self, monitors, position, removed, added):
+        """Forgets the cached refresh rate when monitors are connected or disconnected."""
+        self.monitor_refresh_rate = None
+
+    def _recode_would_help(self, info, monitor_width, monitor_height):
+        """True if recoding would make a video cheaper to play on this display with the current settings."""
+        return (info.width > monitor_width or info.height > monitor_height
+                or info.fps > self._recode_fps_cap() * RECODE_FPS_TOLERANCE
+                or (info.has_audio and not self.enable_video_sound))
+
     def _on_recode_video_activated(self, action, param):
         """Adds a video to the recode queue."""
         if not self.right_clicked_item: return
         item = self.right_clicked_item
-        with self.recode_lock:
-            if item in self.recode_queue or self.recode_currently_running == item:
-                self.window.toast_overlay.add_toast(Adw.Toast.new(f"'{item.path.name}' is already in the queue."))
-                return
-            self.recode_queue.append(item)
+        if not self.recode_scheduler.submit(item):
+            self.window.toast_overlay.add_toast(Adw.Toast.new(f"'{item.path.name}' is already in the queue."))
+            return
         self.window.toast_overlay.add_toast(Adw.Toast.new(f"Added '{item.path.name}' to the recode queue."))
-        self._update_recode_ui()
-        self._start_next_recode_if_possible()
-
-    def _recode_video_thread(self, item, window):
-        """The actual video recoding logic running in a thread."""
-        success, error_message = self._perform_recode(item, window)
-        GLib.idle_add(self._on_recode_finished, item, success, error_message)
-
-    def _on_recode_finished(self, item, success, error_message=None):
-        """Callback executed on the main thread after an encoding job is done."""
-        job_was_cancelled = False
-        with self.recode_lock:
-            if self.recode_currently_running != item:
-                job_was_cancelled = True
-            else:
-                self.recode_currently_running = None
-        if not job_was_cancelled:
-            if success:
-                toast_message = f"Successfully recoded '{item.path.name}'."
-                self.window.toast_overlay.add_toast(Adw.Toast.new(toast_message))
-                GLib.idle_add(self._load_wallpapers_async)
-            else:
-                if "terminated" not in (error_message or "").lower():
-                    toast_message = f"Failed to recode '{item.path.name}'."
-                    print(f"recoding failed for {item.path.name}: {error_message}")
-                    self.window.toast_overlay.add_toast(Adw.Toast.new(toast_message))
-        self._update_recode_ui()
-        self._start_next_recode_if_possible()
-        return False
+
+    def _on_compare_recode_profiles_activated(self, action, param):
+        """Queues a comparison of all recode profiles on a short sample of a video."""
+        if not self.right_clicked_item: return
+        item = self.right_clicked_item
+        if not self.recode_scheduler.submit(item, kind='compare'):
+            self.window.toast_overlay.add_toast(Adw.Toast.new(f"'{item.path.name}' is already being compared."))
+            return
+        self.window.toast_overlay.add_toast(Adw.Toast.new(f"Comparing recode profiles on '{item.path.name}'."))
+
+    def _show_recode_profile_comparison(self, item, results):
+        """Shows encode time, size and decode cost of each profile's sample."""
+        lines = []
+        for result in results:
+            name = RECODE_PROFILES[result['profile']].name
+            if result['profile'] == self.recode_profile:
+                name += " (current)"
+            decode = f"{result['decode_load'] * 100:.0f}% of a core to play" if result['decode_load'] is not None else "decode cost unknown"
+            lines.append(f"{name}: {result['encode_seconds']:.1f} s to encode · {self._format_size(result['bytes'])} · {decode}")
+        dialog = create_message_dialog(self.window, f"Recode profiles for '{item.path.name}'", "\n".join(lines))
+        dialog.present(self.window)
+
+    def _on_recode_finished(self, job, success, error_message=None):
+        """Called by the recode scheduler on the main thread after a job that wasn't stopped is done."""
+        item = job.item
+        if job.kind == 'compare' and success:
+            self._show_recode_profile_comparison(item, job.result)
+        elif job.kind == 'loop' and success:
+            self.window.toast_overlay.add_toast(Adw.Toast.new(f"Created a seamless loop of '{item.path.name}'."))
+            GLib.idle_add(self._load_wallpapers_async)
+        elif success:
+            toast_message = f"Successfully recoded '{item.path.name}'."
+            self.window.toast_overlay.add_toast(Adw.Toast.new(toast_message))
+            GLib.idle_add(self._load_wallpapers_async)
+        elif "terminated" not in (error_message or "").lower():
+            toast_message = f"Failed to recode '{item.path.name}'."
+            print(f"recoding failed for {item.path.name}: {error_message}")
+            self.window.toast_overlay.add_toast(Adw.Toast.new(toast_message))
 
     def _on_delete_wallpaper_activated(self, action, param):
         """Handles the 'Delete' action from the context menu."""
@@ -1689,16 +2342,61 @@ class Manpaper(Adw.Application):
             backend = self.settings.get_string('live-backend')
             if backend == 'swww' and item.path.suffix.lower() != '.gif':
                 return False
-            if self.hide_original_after_recode and '_recoded' not in item.path.name:
-                recoded_path = item.path.parent / 'recoded' / f"{item.path.stem}_recoded{item.path.suffix}"
-                if recoded_path.exists():
-                    return False
+            if self.hide_original_after_recode:
+                key = variant_key(item.path)
+                preferred = self.preferred_variants.get(key)
+                if preferred:
+                    if preferred != str(item.path):
+                        return False
+                elif item.path.parent.name != 'recoded' and key in self.live_variant_groups:
+                    return False # Not probed yet; hide the original as before
 
         if self.search_text and self.search_text.lower() not in name.lower():
             return False
             
         return True
 
+    def _refresh_live_variants(self):
+        """
+        Groups live wallpapers with their recoded versions and probes the groups'
+        files in the background, so the filter can show only the cheapest variant.
+        """
+        groups = {}
+        mtimes = {}
+        for i in range(self.live_store.get_n_items()):
+            item = self.live_store.get_item(i)
+            if isinstance(item.path, Path):
+                groups.setdefault(variant_key(item.path), []).append(str(item.path))
+                mtimes[str(item.path)] = item.mtime
+        self.live_variant_groups = {key: paths for key, paths in groups.items() if len(paths) > 1}
+        to_probe = [(path, mtimes[path]) for paths in self.live_variant_groups.values() for path in paths
+                    if self.video_info.get(path, (None,))[0] != mtimes[path]]
+        if to_probe:
+            threading.Thread(target=self._probe_live_variants_thread, args=(to_probe,), daemon=True).start()
+        else:
+            self._update_preferred_variants()
+
+    def _probe_live_variants_thread(self, to_probe):
+        results = {path: (mtime, probe_video(path)) for path, mtime in to_probe}
+        GLib.idle_add(self._on_live_variants_probed, results)
+
+    def _on_live_variants_probed(self, results):
+        self.video_info.update(results)
+        self._update_preferred_variants()
+        return False
+
+    def _update_preferred_variants(self):
+        """Picks the variant to show for every group and refilters the live view."""
+        live_paths = {path for paths in self.live_variant_groups.values() for path in paths}
+        self.video_info = {path: entry for path, entry in self.video_info.items() if path in live_paths}
+        preferred = {}
+        for key, paths in self.live_variant_groups.items():
+            choice = pick_variant({path: self.video_info.get(path, (None, None))[1] for path in paths}, self.enable_video_sound)
+            if choice:
+                preferred[key] = choice
+        self.preferred_variants = preferred
+        self.live_filter.changed(Gtk.FilterChange.DIFFERENT)
+
     def _online_wallpaper_filter_func(self, item):
         """Filter function for online wallpapers."""
         if not self.online_search_text: return True
@@ -1800,6 +2498,15 @@ class Manpaper(Adw.Application):
             self.online_current_page = 1
         else:
             self.online_current_page = page
+        if self.online_current_page == 1:
+            self.online_last_page = None
+            self.online_page_loading = False
+            # Requests for the previous query are no longer wanted; closing their
+            # responses aborts transfers already running in the engine's executor
+            self.online_search_token.cancel()
+            self.online_search_token = CancelToken()
+            self.online_engine.cancel_group('search')
+            self.online_engine.cancel_group('prefetch')
 
         query = self.online_search_text
         api_key = self.settings.get_string('wallhaven-api-key')
@@ -1818,33 +2525,75 @@ class Manpaper(Adw.Application):
             self.window.toast_overlay.add_toast(Adw.Toast.new("Wallhaven API key not set in preferences."))
             return
 
+        params = build_search_params(query, api_key, sfw, sketchy, nsfw, general, anime, people, resolution, atleast, ratios, self.online_current_page)
+        token = self.online_search_token
+
+        # Show cached results right away; only go to the network when they are stale or missing
+        cached = self.search_cache.lookup(params)
+        if cached:
+            results, fresh = cached
+            self._show_online_results(results, params['page'])
+            if fresh:
+                return
+        else:
+            self.online_page_loading = True
+
         self.background_tasks += 1
         self._update_spinner()
-        threading.Thread(target=self._online_search_thread, args=(query, api_key, sfw, sketchy, nsfw, general, anime, people, resolution, atleast, ratios, self.online_current_page), daemon=True).start()
-
-    def _online_search_thread(self, query, api_key, sfw, sketchy, nsfw, general, anime, people, resolution, atleast, ratios, page):
-        """Runs the online search in a background thread."""
-        results = search_wallhaven(query, api_key, sfw, sketchy, nsfw, general, anime, people, resolution, atleast, ratios, page)
-        GLib.idle_add(self._on_online_search_finished, results)
+        revalidating = cached is not None
+        future = self.online_engine.submit(self.online_engine.run(search_wallhaven, params, self.search_cache, token, token=token),
+                                           lambda results, error: self._on_online_search_finished(token, params['page'], results or {"error": error}, revalidating),
+                                           group='search')
+        # A cancelled search never reaches its callback, so release the spinner here
+        future.add_done_callback(lambda f: f.cancelled() and GLib.idle_add(self._on_online_search_cancelled))
+
+    def _on_online_search_cancelled(self):
+        self.background_tasks -= 1
+        self._update_spinner()
+        return False
 
-    def _on_online_search_finished(self, results):
+    def _on_online_search_finished(self, token, page, results, revalidating):
         """Updates the online store after the search is finished."""
         self.background_tasks -= 1
         self._update_spinner()
 
+        if token is not self.online_search_token or token.cancelled or isinstance(results.get("error"), RequestCancelled):
+            return # Superseded by a newer search; never touch online_store
+        self.online_page_loading = False
+
         if "error" in results:
-            self.window.toast_overlay.add_toast(Adw.Toast.new(f"Online search error: {results['error']}"))
+            if page > 1 and not revalidating:
+                self.online_current_page = page - 1 # Retried on the next scroll
+            if revalidating:
+                print(f"Could not refresh cached search results: {results['error']}")
+            else:
+                self.window.toast_overlay.add_toast(Adw.Toast.new(f"Online search error: {results['error']}"))
             return
 
-        print(f"Processed online search results: {results}")
-        
-        if self.online_current_page == 1:
-            self.online_store.splice(0, self.online_store.get_n_items(), []) # Clear existing items
-            for item in results:
-                self.online_store.append(item)
+        if revalidating:
+            # Cached results are already shown; only page 1 is replaced if it changed
+            items = results["items"]
+            shown = [self.online_store.get_item(i).wall_id for i in range(self.online_first_page_size)]
+            if page != 1 or shown == [item.wall_id for item in items]:
+                return
+        self._show_online_results(results, page, revalidating)
+
+    def _show_online_results(self, results, page, revalidating=False):
+        """
+        Replaces the online store with page 1 results or appends later pages. A revalidated
+        page 1 only replaces the first page, keeping later pages that were already scrolled in.
+        """
+        items = results["items"]
+        print(f"Showing {len(items)} online results for page {page}.")
+        self.online_last_page = results["meta"].get("last_page", self.online_last_page)
+        if page == 1:
+            replaced = self.online_first_page_size if revalidating else self.online_store.get_n_items()
+            self.online_store.splice(0, replaced, items)
+            self.online_first_page_size = len(items)
         else:
-            for item in results:
-                self.online_store.append(item)
+            self.online_store.splice(self.online_store.get_n_items(), 0, items)
+            self._prefetch_online_thumbnails(items)
+        self._update_load_more_button()
         
         # self.online_filter.changed(Gtk.FilterChange.DIFFERENT) # Reverted to this
         self._update_status_page_visibility()
@@ -1889,7 +2638,7 @@ class Manpaper(Adw.Application):
         dialog = create_confirmation_dialog(
             self.window,
             title="Clear Cache?",
-            body="All cached thumbnails will be deleted. This action cannot be undone.",
+            body="All cached thumbnails and online search results will be deleted. This action cannot be undone.",
             confirm_text="Clear",
             confirm_appearance=Adw.ResponseAppearance.DESTRUCTIVE,
             callback=self._on_clear_cache_dialog_response
@@ -1899,20 +2648,24 @@ class Manpaper(Adw.Application):
     def _on_clear_cache_dialog_response(self, dialog, response):
         if response == "confirm":  # Changed from "clear" to "confirm"
 
-            for f in self.cache_dir.glob('*'):
+            self.thumbnail_manifest.clear()
+            self.thumbnail_retried.clear()
+            self.online_thumbnail_cache.clear()
+            self.search_cache.clear()
+            for f in [*self.cache_dir.glob('*'), *self.online_preview_dir.glob('*')]:
                 try:
                     f.unlink()
                 except OSError as e:
                     print(f"Error deleting cache file {f}: {e}")
             
             self.texture_cache.clear()
+            self._update_thumbnail_cache_size_label()
             self.window.toast_overlay.add_toast(Adw.Toast.new("Thumbnail cache cleared"))
 
-            # Force a re-bind of all items in both views to trigger thumbnail regeneration
+            # Refresh bound cells so thumbnails get regenerated
             for store in [self.static_store, self.live_store]:
-                items = [store.get_item(i) for i in range(store.get_n_items())]
-                new_items = [WallpaperItem(path=item.path, title=item.title) for item in items]
-                store.splice(0, store.get_n_items(), new_items)
+                for i in range(store.get_n_items()):
+                    store.get_item(i).emit('thumbnail-changed')
 
     def _on_reload_css_clicked(self, button):
         """Reloads the custom CSS."""
@@ -1964,6 +2717,7 @@ class Manpaper(Adw.Application):
         self.enable_video_sound = switch.get_active()
         self.settings.set_boolean('enable-video-sound', self.enable_video_sound)
         self.send_mpv_command(["set_property", "mute", "no" if self.enable_video_sound else "yes"])
+        self._update_preferred_variants() # Silent variants only win while sound is off
 
     def _on_video_volume_changed(self, adjustment):
         """Handles changes to the video volume setting."""
@@ -1990,6 +2744,22 @@ class Manpaper(Adw.Application):
         self.swww_fill_type = model.get_string(combo.get_selected())
         self.settings.set_string('swww-fill-type', self.swww_fill_type)
 
+    def _on_loop_crossfade_changed(self, adjustment):
+        """Handles changes to the crossfade length of seamless loops."""
+        self.loop_crossfade = adjustment.get_value()
+        self.settings.set_double('loop-crossfade', self.loop_crossfade)
+
+    def _on_recode_max_fps_changed(self, adjustment):
+        """Handles changes to the frame rate cap for recoded videos."""
+        self.recode_max_fps = int(adjustment.get_value())
+        self.settings.set_int('recode-max-fps', self.recode_max_fps)
+        self.monitor_refresh_rate = None
+
+    def _on_recode_profile_changed(self, combo, _):
+        """Handles changes to the recode profile."""
+        self.recode_profile = list(RECODE_PROFILES)[combo.get_selected()]
+        self.settings.set_string('recode-profile', self.recode_profile)
+
     def _on_mpvpaper_fill_type_changed(self, combo, _):
         """Handles changes to the mpvpaper fill type."""
         model = combo.get_model()
@@ -2006,7 +2776,7 @@ class Manpaper(Adw.Application):
         dialog = create_confirmation_dialog(
             self.window,
             title="Recode all videos?",
-            body="This will recode all videos with a resolution higher than your display. This may take a long time and consume significant CPU resources. Original files will not be modified.",
+            body="This will recode all videos with a higher resolution or frame rate than your display, or with audio while sound is off. This may take a long time and consume significant CPU resources. Original files will not be modified.",
             confirm_text="Recode All",
             confirm_appearance=Adw.ResponseAppearance.SUGGESTED,
             callback=self._on_recode_all_dialog_response
@@ -2023,7 +2793,7 @@ class Manpaper(Adw.Application):
             thread.start()
 
     def _recode_all_thread(self, window):
-        """Identifies and adds high-resolution videos to the queue."""
+        """Identifies and adds videos that would play cheaper after recoding to the queue."""
         monitor_width, monitor_height = get_monitor_resolution(window)
         if not monitor_width or not monitor_height:
             GLib.idle_add(self.window.toast_overlay.add_toast, Adw.Toast.new("Error: Could not determine display resolution for batch recode."))
@@ -2034,25 +2804,53 @@ class Manpaper(Adw.Application):
             if isinstance(item.path, str): # Skip URLs
                 continue
             path = item.path
-            recoded_path = path.with_name(f"{item.path.stem}_recoded{item.path.suffix}")
-            with self.recode_lock:
-                already_queued = item in self.recode_queue or self.recode_currently_running == item
-            if recoded_path.exists() or '_recoded' in path.name or already_queued:
+            recoded_path = path.parent / 'recoded' / f"{path.stem}_recoded{path.suffix}"
+            if recoded_path.exists() or path.parent.name == 'recoded' or self.recode_scheduler.find(item):
                 continue
-            try:
-                cmd = ['ffprobe', '-v', 'error', '-select_streams', 'v:0', '-show_entries', 'stream=width,height', '-of', 'csv=s=x:p=0', str(path)]
-                result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-                video_width, video_height = map(int, result.stdout.strip().split('x'))
-                if video_width > monitor_width or video_height > monitor_height:
-                    with self.recode_lock:
-                        self.recode_queue.append(item)
-                    queued_count += 1
-            except (FileNotFoundError, subprocess.CalledProcessError, ValueError) as e:
-                print(f"Could not process {path.name} for batch recode: {e}")
+            info = probe_video(path)
+            if not info:
+                print(f"Could not process {path.name} for batch recode")
                 continue
+            if self._recode_would_help(info, monitor_width, monitor_height) and self.recode_scheduler.submit(item):
+                queued_count += 1
         if queued_count > 0:
             GLib.idle_add(self.window.toast_overlay.add_toast, Adw.Toast.new(f"Added {queued_count} videos to the recode queue."))
-            GLib.idle_add(self._start_next_recode_if_possible)
+
+    def _on_texture_cache_budget_changed(self, adjustment):
+        """Handles changes to the texture cache memory budget."""
+        self.texture_cache_budget = int(adjustment.get_value())
+        self.settings.set_int('texture-cache-budget', self.texture_cache_budget)
+        self.texture_cache.set_budget(self.texture_cache_budget * 1024 * 1024)
+
+    def _on_recode_workers_changed(self, adjustment):
+        """Handles changes to the number of parallel recodes."""
+        self.recode_workers = int(adjustment.get_value())
+        self.settings.set_int('recode-workers', self.recode_workers)
+        self.recode_scheduler.set_workers(self.recode_workers)
+
+    def _on_recode_thread_budget_changed(self, adjustment):
+        """Handles changes to the total number of threads shared by all recodes."""
+        self.recode_thread_budget = int(adjustment.get_value())
+        self.settings.set_int('recode-thread-budget', self.recode_thread_budget)
+        self.recode_scheduler.set_thread_budget(self.recode_thread_budget)
+
+    def _on_download_bandwidth_limit_changed(self, adjustment):
+        """Handles changes to the download bandwidth cap."""
+        self.download_bandwidth_limit = int(adjustment.get_value())
+        self.settings.set_int('download-bandwidth-limit', self.download_bandwidth_limit)
+        self.download_manager.limiter.set_rate(self.download_bandwidth_limit * 1024)
+
+    def _on_search_cache_ttl_changed(self, adjustment):
+        """Handles changes to how long cached search results count as fresh."""
+        self.search_cache_ttl = int(adjustment.get_value())
+        self.settings.set_int('search-cache-ttl', self.search_cache_ttl)
+        self.search_cache.ttl_seconds = self.search_cache_ttl * 60
+
+    def _on_thumbnail_cache_max_size_changed(self, adjustment):
+        """Handles changes to the thumbnail cache size limit."""
+        self.thumbnail_cache_max_size = int(adjustment.get_value())
+        self.settings.set_int('thumbnail-cache-max-size', self.thumbnail_cache_max_size)
+        self._start_thumbnail_gc()
 
     def _on_scroll_step_changed(self, adjustment):
         """Handles changes to the zoom scroll step."""
@@ -2071,6 +2869,7 @@ class Manpaper(Adw.Application):
         
     def _on_scroll_resize(self, controller, dx, dy):
         """Handles zooming with Ctrl+Scroll."""
+        self._note_user_interaction()
         if not (controller.get_current_event_state() & Gdk.ModifierType.CONTROL_MASK):
             return False
         if not self.preview_adjustment: return True
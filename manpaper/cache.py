@@ -0,0 +1,174 @@
+import threading
+import queue
+import itertools
+from collections import OrderedDict
+import gi
+gi.require_version('Gdk', '4.0')
+from gi.repository import Gdk, GLib
+
+from .config import TEXTURE_LOADER_WORKERS
+
+# --- Texture Cache ---
+class TextureCache:
+    """
+    LRU cache of Gdk.Texture objects bounded by their decoded size.
+
+    Each texture is charged width x height x 4 bytes. When a put() pushes the total
+    over the budget, the least recently used textures are evicted.
+    """
+    def __init__(self, budget_bytes):
+        self.budget_bytes = budget_bytes
+        self.textures = OrderedDict()
+        self.sizes = {}
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def texture_bytes(texture):
+        """Estimated memory used by a decoded texture."""
+        return texture.get_width() * texture.get_height() * 4
+
+    def __contains__(self, key):
+        with self.lock:
+            return key in self.textures
+
+    def __len__(self):
+        return len(self.textures)
+
+    def get(self, key):
+        """Returns the cached texture for key and marks it as recently used, or None."""
+        with self.lock:
+            texture = self.textures.get(key)
+            if texture is None:
+                self.misses += 1
+                return None
+            self.textures.move_to_end(key)
+            self.hits += 1
+            return texture
+
+    def put(self, key, texture):
+        """Adds a texture, evicting least recently used entries to stay within budget."""
+        size = self.texture_bytes(texture)
+        with self.lock:
+            if key in self.textures:
+                self._remove(key)
+            if size > self.budget_bytes:
+                return # Would evict everything else and still not fit
+            self.textures[key] = texture
+            self.sizes[key] = size
+            self.total_bytes += size
+            self._evict()
+
+    def pop(self, key, default=None):
+        """Removes key from the cache and returns its texture."""
+        with self.lock:
+            if key not in self.textures:
+                return default
+            return self._remove(key)
+
+    def clear(self):
+        with self.lock:
+            self.textures.clear()
+            self.sizes.clear()
+            self.total_bytes = 0
+
+    def set_budget(self, budget_bytes):
+        """Changes the byte budget, evicting immediately if it shrank."""
+        with self.lock:
+            self.budget_bytes = budget_bytes
+            self._evict()
+
+    def stats(self):
+        """Returns counters for logging and the preferences view."""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.textures),
+                'bytes': self.total_bytes,
+                'budget': self.budget_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+    def _remove(self, key):
+        texture = self.textures.pop(key)
+        self.total_bytes -= self.sizes.pop(key)
+        return texture
+
+    def _evict(self):
+        while self.total_bytes > self.budget_bytes and self.textures:
+            oldest = next(iter(self.textures))
+            self._remove(oldest)
+            self.evictions += 1
+
+# --- Texture Loader ---
+class TextureLoader:
+    """
+    Decodes textures in worker threads and hands them back on the main thread.
+
+    Requests are served newest first, so during fast scrolling the cells that just
+    became visible decode before the ones that already scrolled away. A cancelled
+    request never reaches its callback; if it was already decoding, the texture
+    still lands in the cache. A file that fails to decode is reported through the
+    request's on_error, so the caller can regenerate it.
+    """
+    def __init__(self, texture_cache, workers=TEXTURE_LOADER_WORKERS):
+        self.texture_cache = texture_cache
+        self.queue = queue.LifoQueue()
+        self.pending = {}
+        self.ids = itertools.count(1)
+        self.lock = threading.Lock()
+        for _ in range(workers):
+            threading.Thread(target=self._worker, daemon=True).start()
+
+    def load(self, path, callback, on_error=None):
+        """
+        Queues path for decoding. callback(texture), or on_error() if the file is missing
+        or unreadable, runs on the main thread. Returns a request id.
+        """
+        request_id = next(self.ids)
+        with self.lock:
+            self.pending[request_id] = (callback, on_error)
+        self.queue.put((request_id, path))
+        return request_id
+
+    def cancel(self, request_id):
+        """Drops a request; its callback will not be called."""
+        if request_id:
+            with self.lock:
+                self.pending.pop(request_id, None)
+
+    def _worker(self):
+        while True:
+            request_id, path = self.queue.get()
+            with self.lock:
+                wanted = request_id in self.pending
+            if not wanted:
+                continue
+            try:
+                texture = Gdk.Texture.new_from_filename(path)
+            except GLib.Error as e:
+                print(f"Error loading texture {path}: {e}")
+                GLib.idle_add(self._deliver_error, request_id)
+                continue
+            GLib.idle_add(self._deliver, request_id, path, texture)
+
+    def _deliver(self, request_id, path, texture):
+        self.texture_cache.put(path, texture)
+        with self.lock:
+            callbacks = self.pending.pop(request_id, None)
+        if callbacks:
+            callbacks[0](texture)
+        return False # For GLib.idle_add
+
+    def _deliver_error(self, request_id):
+        with self.lock:
+            callbacks = self.pending.pop(request_id, None)
+        if callbacks and callbacks[1]:
+            callbacks[1]()
+        return False # For GLib.idle_add
@@ -6,3 +6,46 @@ BACKEND_PROCESSES = {
     'swww': 'swww-daemon',
     'mpvpaper': 'mpvpaper'
 }
+
+# Longest edge in pixels of cached static wallpaper thumbnails (matches the preview size upper bound)
+THUMBNAIL_SIZE = 512
+
+# Worker threads decoding preview textures off the GTK main thread
+TEXTURE_LOADER_WORKERS = 2
+
+# Bytes read from each end of a file to fingerprint it for the thumbnail cache
+THUMBNAIL_FINGERPRINT_BYTES = 64 * 1024
+
+# Background thumbnail pre-warming pauses for this long after the last scroll or key press
+PREWARM_IDLE_SECONDS = 2
+
+# Window in which file watcher events are coalesced into one store update
+LIBRARY_WATCH_BATCH_MS = 500
+
+# Shared HTTP client: pooled connections, concurrent requests per host, (connect, read) timeouts in seconds
+HTTP_POOL_SIZE = 16
+HTTP_MAX_PER_HOST = 6
+HTTP_TIMEOUT = (5, 30)
+HTTP_RETRIES = 3
+
+# Wallhaven thumbnails kept on disk; entries younger than the freshness window are used without revalidating
+ONLINE_THUMBNAIL_CACHE_MB = 128
+ONLINE_THUMBNAIL_FRESH_SECONDS = 7 * 24 * 3600
+
+# The next Wallhaven results page is fetched once the online grid is scrolled within this many screens of its end
+ONLINE_PREFETCH_SCREENS = 1.5
+
+# Wallpaper downloads running at once; the rest wait in the download queue
+DOWNLOAD_WORKERS = 3
+
+# Full-size online images streamed for the properties dialog; the most recent ones are kept for later downloads
+ONLINE_PREVIEW_CACHE_FILES = 8
+
+# Scheduling priority of recode processes (nice value); they also run in the idle I/O class when ionice exists
+RECODE_NICENESS = 10
+
+# Length of the clip encoded with each profile when comparing recode profiles
+RECODE_SAMPLE_SECONDS = 10
+
+# Recodes only resample videos running this much faster than the frame rate cap (59.94 vs 60 Hz is left alone)
+RECODE_FPS_TOLERANCE = 1.05
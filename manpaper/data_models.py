@@ -8,26 +8,33 @@ class RecodeQueueItem(GObject.Object):
     text = GObject.Property(type=str)
     status = GObject.Property(type=str)
     wallpaper_item = GObject.Property(type=object)
+    job = GObject.Property(type=object)
 
-    def __init__(self, text, status, wallpaper_item):
+    def __init__(self, text, status, wallpaper_item, job=None):
         super().__init__()
         self.text = text
         self.status = status
         self.wallpaper_item = wallpaper_item
+        self.job = job
 
 # --- Wallpaper Item ---
 class WallpaperItem(GObject.Object):
     """A GObject representing a single wallpaper file."""
     __gsignals__ = {
-        'preview-size-changed': (GObject.SignalFlags.RUN_FIRST, None, ())
+        'preview-size-changed': (GObject.SignalFlags.RUN_FIRST, None, ()),
+        'thumbnail-changed': (GObject.SignalFlags.RUN_FIRST, None, ())
     }
     path = GObject.Property(type=object)
     title = GObject.Property(type=str)
+    mtime = GObject.Property(type=GObject.TYPE_INT64, default=0) # st_mtime_ns, 0 for URLs
+    size = GObject.Property(type=GObject.TYPE_INT64, default=0)
 
-    def __init__(self, path, title=None):
+    def __init__(self, path, title=None, mtime=0, size=0):
         super().__init__()
         self.path = path
         self.title = title
+        self.mtime = mtime
+        self.size = size
 
 # --- Online Wallpaper Item ---
 class OnlineWallpaperItem(GObject.Object):
@@ -64,6 +71,7 @@ class DownloadQueueItem(GObject.Object):
     text = GObject.Property(type=str)
     status = GObject.Property(type=str)
     online_wallpaper_item = GObject.Property(type=object)
+    job = GObject.Property(type=object) # DownloadJob, set once queued
 
     def __init__(self, text, status, online_wallpaper_item):
         super().__init__()
@@ -0,0 +1,124 @@
+import asyncio
+import threading
+import weakref
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from gi.repository import GLib
+
+from .config import HTTP_POOL_SIZE, HTTP_MAX_PER_HOST
+
+# --- Online Engine ---
+class OnlineEngine:
+    """
+    Runs all online work on one asyncio event loop in a dedicated thread.
+
+    Blocking calls (HTTP through the shared HttpClient, decoding) run in the loop's
+    executor behind a global and a per-host asyncio.Semaphore, so the number of
+    requests in flight is capped no matter how many callers there are. Work is
+    submitted from the main thread with submit(); results come back through
+    GLib.idle_add. Tasks can be tagged with a group and cancelled together, e.g.
+    every search request when the query changes. A cancelled task keeps its slots
+    until its executor call has really returned, so the caps stay accurate.
+    """
+    def __init__(self, max_concurrent=HTTP_POOL_SIZE, max_per_host=HTTP_MAX_PER_HOST):
+        self.max_concurrent = max_concurrent
+        self.max_per_host = max_per_host
+        self.loop = asyncio.new_event_loop()
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix='online')
+        self.loop.set_default_executor(self.executor)
+        self.global_limit = None
+        self.host_limits = {}
+        self.groups = defaultdict(set) # Only touched on the loop thread
+        self.tokens = weakref.WeakSet() # CancelTokens of calls started with run(), cancelled by stop()
+        self.tokens_lock = threading.Lock()
+        threading.Thread(target=self._run_loop, daemon=True).start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.global_limit = asyncio.Semaphore(self.max_concurrent)
+        self.loop.run_forever()
+
+    def _host_limit(self, host):
+        limit = self.host_limits.get(host)
+        if limit is None:
+            limit = self.host_limits[host] = asyncio.Semaphore(self.max_per_host)
+        return limit
+
+    async def run(self, func, *args, host=None, token=None):
+        """
+        Runs a blocking func(*args) in the executor, counting against the global and host
+        caps. token is the CancelToken func uses for its transfers; stop() cancels it.
+        """
+        if token:
+            with self.tokens_lock:
+                self.tokens.add(token)
+        limits = [self.global_limit] if host is None else [self.global_limit, self._host_limit(host)]
+        acquired = []
+        try:
+            for limit in limits:
+                await limit.acquire()
+                acquired.append(limit)
+            future = self.executor.submit(func, *args)
+        except BaseException:
+            self._release(acquired)
+            raise
+        # Cancelling the task does not stop a running call, so release only once it returns
+        future.add_done_callback(lambda f: self.loop.call_soon_threadsafe(self._release, acquired))
+        return await asyncio.wrap_future(future, loop=self.loop)
+
+    def _release(self, limits):
+        for limit in limits:
+            limit.release()
+
+    def submit(self, coro, callback=None, group=None):
+        """
+        Schedules a coroutine on the engine loop from any thread. callback(result, error)
+        runs on the GTK main thread when it finishes; it is not called if the task was
+        cancelled. Returns a concurrent.futures.Future.
+        """
+        future = asyncio.run_coroutine_threadsafe(self._run_task(coro, group), self.loop)
+        if callback:
+            future.add_done_callback(lambda f: GLib.idle_add(self._deliver, f, callback))
+        return future
+
+    async def _run_task(self, coro, group):
+        task = asyncio.current_task()
+        if group:
+            self.groups[group].add(task)
+        try:
+            return await coro
+        finally:
+            if group:
+                self.groups[group].discard(task)
+
+    def _deliver(self, future, callback):
+        if future.cancelled():
+            return False
+        error = future.exception()
+        callback(None if error else future.result(), error)
+        return False # For GLib.idle_add
+
+    def cancel_group(self, group):
+        """Cancels every task submitted with group that has not finished yet."""
+        self.loop.call_soon_threadsafe(self._cancel_group, group)
+
+    def _cancel_group(self, group):
+        for task in self.groups.pop(group, ()):
+            task.cancel()
+
+    def stop(self):
+        """
+        Cancels all tasks and the transfers of their tokens, drops queued executor
+        calls and stops the loop, so no blocking request holds up the exit.
+        """
+        with self.tokens_lock:
+            tokens = list(self.tokens)
+        for token in tokens:
+            token.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+        def shutdown():
+            for task in asyncio.all_tasks(self.loop):
+                task.cancel()
+            self.loop.stop()
+        self.loop.call_soon_threadsafe(shutdown)
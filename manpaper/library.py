@@ -0,0 +1,341 @@
+import os
+import sqlite3
+import threading
+from collections import namedtuple
+from pathlib import Path
+import gi
+gi.require_version('Gio', '2.0')
+from gi.repository import Gio, GLib
+
+from .config import SUPPORTED_STATIC, SUPPORTED_LIVE, LIBRARY_WATCH_BATCH_MS
+
+LibraryEntry = namedtuple('LibraryEntry', ['path', 'mtime', 'size'])
+
+# --- Library Index ---
+class LibraryIndex:
+    """
+    Persistent index of the wallpaper directory, stored as SQLite under the cache dir.
+
+    A rescan is a single os.scandir walk. Directories whose mtime is unchanged are not
+    listed again; their files and subdirectories are taken from the index instead.
+    Editing a file in place does not touch its directory, so such edits are picked up
+    by refresh_files() once per session and by the file watcher while running.
+    """
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS dirs (path TEXT PRIMARY KEY, parent TEXT, mtime INTEGER);
+            CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, dir TEXT, mtime INTEGER, size INTEGER, kind TEXT);
+            CREATE INDEX IF NOT EXISTS dirs_parent ON dirs (parent);
+            CREATE INDEX IF NOT EXISTS files_dir ON files (dir);
+        ''')
+        self.conn.commit()
+
+    @staticmethod
+    def kind_for(name):
+        """Returns 'static', 'live' or None for a file name."""
+        suffix = os.path.splitext(name)[1].lower()
+        if suffix in SUPPORTED_STATIC:
+            return 'static'
+        if suffix in SUPPORTED_LIVE:
+            return 'live'
+        return None
+
+    @staticmethod
+    def _storable(path):
+        """
+        False (and logs it) for paths SQLite cannot store: names that are not valid UTF-8
+        reach Python surrogate-escaped and would raise UnicodeEncodeError.
+        """
+        try:
+            path.encode('utf-8')
+            return True
+        except UnicodeEncodeError:
+            print(f"Skipping {path!r}: its name is not valid UTF-8.")
+            return False
+
+    def _reset_if_root_changed(self, root):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'root'").fetchone()
+        if row and row[0] == root:
+            return
+        self.conn.execute("DELETE FROM dirs")
+        self.conn.execute("DELETE FROM files")
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('root', ?)", (root,))
+
+    def _forget_dir_tree(self, path):
+        """Removes a directory and everything below it from the index."""
+        prefix = path.rstrip(os.sep) + os.sep
+        self.conn.execute("DELETE FROM files WHERE dir = ? OR substr(dir, 1, ?) = ?", (path, len(prefix), prefix))
+        self.conn.execute("DELETE FROM dirs WHERE path = ? OR substr(path, 1, ?) = ?", (path, len(prefix), prefix))
+
+    def _rescan_dir(self, path, mtime):
+        """Lists a changed directory and syncs its files and subdirectories into the index."""
+        subdirs = []
+        files = []
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    if not self._storable(entry.path):
+                        continue
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                            continue
+                        kind = self.kind_for(entry.name)
+                        if kind:
+                            st = entry.stat()
+                            files.append((entry.path, path, st.st_mtime_ns, st.st_size, kind))
+                    except OSError as e:
+                        print(f"Could not stat {entry.path}: {e}")
+        except OSError as e:
+            print(f"Could not list {path}: {e}")
+            return []
+
+        self.conn.execute("DELETE FROM files WHERE dir = ?", (path,))
+        self.conn.executemany("INSERT OR REPLACE INTO files (path, dir, mtime, size, kind) VALUES (?, ?, ?, ?, ?)", files)
+
+        known = {r[0] for r in self.conn.execute("SELECT path FROM dirs WHERE parent = ?", (path,))}
+        for gone in known - set(subdirs):
+            self._forget_dir_tree(gone)
+        self.conn.execute("UPDATE dirs SET mtime = ? WHERE path = ?", (mtime, path))
+        return subdirs
+
+    def scan(self, root):
+        """
+        Brings the index up to date with the directory tree under root.
+        Returns (static_entries, live_entries) as LibraryEntry lists sorted by path.
+        """
+        root = str(Path(root))
+        with self.lock:
+            self._reset_if_root_changed(root)
+            known_dirs = {r[0]: r[1] for r in self.conn.execute("SELECT path, mtime FROM dirs")}
+            seen = set()
+            stack = [(root, None)]
+            while stack:
+                path, parent = stack.pop()
+                if path in seen:
+                    continue
+                seen.add(path)
+                try:
+                    mtime = os.stat(path).st_mtime_ns
+                except OSError:
+                    self._forget_dir_tree(path)
+                    continue
+
+                if path not in known_dirs:
+                    self.conn.execute("INSERT OR REPLACE INTO dirs (path, parent, mtime) VALUES (?, ?, NULL)", (path, parent))
+
+                if known_dirs.get(path) == mtime:
+                    subdirs = [r[0] for r in self.conn.execute("SELECT path FROM dirs WHERE parent = ?", (path,))]
+                else:
+                    subdirs = self._rescan_dir(path, mtime)
+                stack.extend((d, path) for d in subdirs)
+
+            for stale in set(known_dirs) - seen:
+                self._forget_dir_tree(stale)
+            self.conn.commit()
+            return self._entries('static'), self._entries('live')
+
+    def refresh_files(self):
+        """
+        Stats every indexed file and records size and mtime changes, catching files that
+        were edited in place while the app was not watching. One stat per file, so it is
+        meant to run once per session in the background; the index stays usable meanwhile.
+        Returns (changed, gone): changed maps kind to LibraryEntry lists, gone is the
+        set of file paths that no longer exist.
+        """
+        with self.lock:
+            rows = self.conn.execute("SELECT path, mtime, size, kind FROM files").fetchall()
+        changed = {'static': [], 'live': []}
+        gone = set()
+        updates = []
+        for path, mtime, size, kind in rows:
+            try:
+                st = os.stat(path)
+            except OSError:
+                gone.add(path)
+                continue
+            if st.st_mtime_ns != mtime or st.st_size != size:
+                updates.append((st.st_mtime_ns, st.st_size, path))
+                changed[kind].append(LibraryEntry(Path(path), st.st_mtime_ns, st.st_size))
+        with self.lock:
+            self.conn.executemany("UPDATE files SET mtime = ?, size = ? WHERE path = ?", updates)
+            self.conn.executemany("DELETE FROM files WHERE path = ?", [(path,) for path in gone])
+            self.conn.commit()
+        return changed, gone
+
+    def _entries(self, kind):
+        rows = self.conn.execute("SELECT path, mtime, size FROM files WHERE kind = ? ORDER BY path", (kind,))
+        return [LibraryEntry(Path(path), mtime, size) for path, mtime, size in rows]
+
+    def directories(self):
+        """Returns all indexed directory paths."""
+        with self.lock:
+            return [r[0] for r in self.conn.execute("SELECT path FROM dirs")]
+
+    def _add_tree(self, path, parent, added, new_dirs):
+        """Indexes a directory that appeared after the last scan, including everything below it."""
+        stack = [(path, parent)]
+        while stack:
+            dir_path, dir_parent = stack.pop()
+            self.conn.execute("INSERT OR REPLACE INTO dirs (path, parent, mtime) VALUES (?, ?, NULL)", (dir_path, dir_parent))
+            new_dirs.append(dir_path)
+            try:
+                with os.scandir(dir_path) as it:
+                    for entry in it:
+                        if not self._storable(entry.path):
+                            continue
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append((entry.path, dir_path))
+                        elif self.kind_for(entry.name):
+                            self._add_file(entry.path, dir_path, added)
+            except OSError as e:
+                print(f"Could not list {dir_path}: {e}")
+
+    def _add_file(self, path, dir_path, added):
+        if not self._storable(path):
+            return
+        kind = self.kind_for(path)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return
+        self.conn.execute("INSERT OR REPLACE INTO files (path, dir, mtime, size, kind) VALUES (?, ?, ?, ?, ?)",
+                          (path, dir_path, st.st_mtime_ns, st.st_size, kind))
+        added[kind].append(LibraryEntry(Path(path), st.st_mtime_ns, st.st_size))
+
+    def apply_changes(self, added_paths, removed_paths):
+        """
+        Applies file watcher events without walking the whole tree.
+        Returns (added, removed, new_dirs): added maps kind to LibraryEntry lists,
+        removed is the set of file paths that left the index.
+        """
+        added = {'static': [], 'live': []}
+        removed = set()
+        new_dirs = []
+        removed_paths = [path for path in removed_paths if self._storable(path)]
+        with self.lock:
+            for path in removed_paths:
+                prefix = path.rstrip(os.sep) + os.sep
+                rows = self.conn.execute("SELECT path FROM files WHERE path = ? OR substr(dir, 1, ?) = ? OR dir = ?",
+                                         (path, len(prefix), prefix, path))
+                removed.update(r[0] for r in rows)
+                self.conn.execute("DELETE FROM files WHERE path = ?", (path,))
+                self._forget_dir_tree(path)
+
+            for path in added_paths:
+                parent = os.path.dirname(path)
+                if not self._storable(path):
+                    continue
+                if os.path.isdir(path) and not os.path.islink(path):
+                    self._add_tree(path, parent, added, new_dirs)
+                elif self.kind_for(path) and os.path.isfile(path):
+                    self._add_file(path, parent, added)
+            self.conn.commit()
+
+        for kind in added:
+            removed.difference_update(str(e.path) for e in added[kind])
+        return added, removed, new_dirs
+
+# --- Library Watcher ---
+class LibraryWatcher:
+    """
+    Watches the wallpaper directory recursively with one Gio.FileMonitor per directory.
+
+    Add, remove and rename events are coalesced and handed to callback(added, removed)
+    on the main thread at most once per LIBRARY_WATCH_BATCH_MS, so bursts like an rsync
+    of thousands of files arrive as a few batches.
+    """
+    def __init__(self, callback):
+        self.callback = callback
+        self.root = None
+        self.monitors = {}
+        self.pending_added = set()
+        self.pending_removed = set()
+        self.flush_source_id = 0
+
+    def watch(self, root, directories):
+        """Starts watching root and the given directories below it. Must run on the main thread."""
+        root = str(Path(root))
+        if root != self.root:
+            self.stop()
+            self.root = root
+        for path in [root] + list(directories):
+            self._watch_dir(path)
+        return False # For GLib.idle_add
+
+    def watch_dirs(self, directories):
+        """Adds monitors for directories that appeared while watching."""
+        for path in directories:
+            self._watch_dir(path)
+
+    def stop(self):
+        """Cancels all monitors and drops pending events."""
+        for monitor in self.monitors.values():
+            monitor.cancel()
+        self.monitors.clear()
+        self.pending_added.clear()
+        self.pending_removed.clear()
+        if self.flush_source_id:
+            GLib.source_remove(self.flush_source_id)
+            self.flush_source_id = 0
+        self.root = None
+        return False # For GLib.idle_add
+
+    def _watch_dir(self, path):
+        if path in self.monitors:
+            return
+        try:
+            monitor = Gio.File.new_for_path(path).monitor_directory(Gio.FileMonitorFlags.WATCH_MOVES, None)
+        except GLib.Error as e:
+            # Usually the inotify watch limit (fs.inotify.max_user_watches)
+            print(f"Could not watch {path}: {e.message}")
+            return
+        monitor.connect('changed', self._on_changed)
+        self.monitors[path] = monitor
+
+    def _unwatch_tree(self, path):
+        prefix = path.rstrip(os.sep) + os.sep
+        for watched in [p for p in self.monitors if p == path or p.startswith(prefix)]:
+            self.monitors.pop(watched).cancel()
+
+    def _queue_added(self, path):
+        self.pending_removed.discard(path)
+        self.pending_added.add(path)
+
+    def _queue_removed(self, path):
+        self.pending_added.discard(path)
+        self.pending_removed.add(path)
+        if path in self.monitors:
+            self._unwatch_tree(path)
+
+    def _on_changed(self, monitor, file, other_file, event_type):
+        path = file.get_path()
+        if not path:
+            return
+        if event_type in (Gio.FileMonitorEvent.CREATED, Gio.FileMonitorEvent.MOVED_IN,
+                          Gio.FileMonitorEvent.CHANGES_DONE_HINT):
+            self._queue_added(path)
+        elif event_type in (Gio.FileMonitorEvent.DELETED, Gio.FileMonitorEvent.MOVED_OUT):
+            self._queue_removed(path)
+        elif event_type == Gio.FileMonitorEvent.RENAMED:
+            self._queue_removed(path)
+            if other_file and other_file.get_path():
+                self._queue_added(other_file.get_path())
+        else:
+            return
+
+        if not self.flush_source_id:
+            self.flush_source_id = GLib.timeout_add(LIBRARY_WATCH_BATCH_MS, self._flush)
+
+    def _flush(self):
+        self.flush_source_id = 0
+        added, removed = self.pending_added, self.pending_removed
+        self.pending_added, self.pending_removed = set(), set()
+        if added or removed:
+            self.callback(added, removed)
+        return GLib.SOURCE_REMOVE
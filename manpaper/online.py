@@ -1,14 +1,673 @@
+import os
+import json
+import time
+import queue
+import sqlite3
+import tempfile
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+from urllib.parse import urlsplit
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import gi
+gi.require_version('Gdk', '4.0')
+gi.require_version('GdkPixbuf', '2.0')
+from gi.repository import Gdk, GdkPixbuf, GLib
+
+from .config import (
+    HTTP_POOL_SIZE, HTTP_MAX_PER_HOST, HTTP_TIMEOUT, HTTP_RETRIES,
+    ONLINE_THUMBNAIL_CACHE_MB, ONLINE_THUMBNAIL_FRESH_SECONDS, DOWNLOAD_WORKERS
+)
 from .data_models import OnlineWallpaperItem
 
-def search_wallhaven(query: str, api_key: str, sfw: bool, sketchy: bool, nsfw: bool, general: bool, anime: bool, people: bool, resolution: str, atleast: str, ratios: str, page: int = 1):
+WALLHAVEN_SEARCH_URL = "https://wallhaven.cc/api/v1/search"
+
+class RequestCancelled(Exception):
+    """Raised by HttpClient when the CancelToken of a request was cancelled."""
+
+class CancelToken:
     """
-    Searches Wallhaven for wallpapers.
+    Cancellation handle for one or more HTTP requests.
+
+    cancel() closes every response currently registered with the token, which shuts
+    its socket and makes the thread reading it fail right away instead of finishing
+    the transfer. Requests started after cancel() raise RequestCancelled immediately.
     """
-    if not api_key:
-        return {"error": "API key is not set."}
+    def __init__(self):
+        self.cancelled = False
+        self.responses = set()
+        self.lock = threading.Lock()
+
+    def cancel(self):
+        with self.lock:
+            self.cancelled = True
+            responses, self.responses = self.responses, set()
+        for response in responses:
+            response.close()
+
+    def check(self):
+        if self.cancelled:
+            raise RequestCancelled()
+
+    def register(self, response):
+        with self.lock:
+            if not self.cancelled:
+                self.responses.add(response)
+                return
+        response.close()
+        raise RequestCancelled()
+
+    def unregister(self, response):
+        with self.lock:
+            self.responses.discard(response)
+
+# --- HTTP Client ---
+class HttpClient:
+    """
+    Shared HTTP client for all Wallhaven traffic.
+
+    One requests.Session keeps TLS connections alive between requests, so a page of
+    thumbnails reuses a few connections instead of opening one each. Idempotent
+    requests are retried with exponential backoff on connection errors, 429 and 5xx
+    (honouring Retry-After), every request has a timeout, and each host gets its own
+    concurrency limit. Safe to use from any thread.
+    """
+    def __init__(self, pool_size=HTTP_POOL_SIZE, max_per_host=HTTP_MAX_PER_HOST, timeout=HTTP_TIMEOUT, retries=HTTP_RETRIES):
+        self.timeout = timeout
+        self.max_per_host = max_per_host
+        self.host_slots = {}
+        self.lock = threading.Lock()
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset({'GET', 'HEAD'}),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers['User-Agent'] = 'Manpaper'
+
+    def _host_slot(self, url):
+        host = urlsplit(url).netloc
+        with self.lock:
+            slot = self.host_slots.get(host)
+            if slot is None:
+                slot = self.host_slots[host] = threading.BoundedSemaphore(self.max_per_host)
+            return slot
+
+    def get(self, url, token=None, **kwargs):
+        """
+        Fetches url and reads the whole body. Raises requests.exceptions.RequestException
+        on connection errors and HTTP error statuses, and RequestCancelled if token is
+        cancelled before the body has been read.
+        """
+        with self.stream(url, token=token, **kwargs) as response:
+            try:
+                response.content # Read the body while holding the host slot
+            except Exception:
+                if token:
+                    token.check()
+                raise
+        return response
+
+    @contextmanager
+    def stream(self, url, token=None, **kwargs):
+        """
+        Context manager yielding a streaming response. The host slot and the pooled
+        connection are held until the block exits. Cancelling token closes the response.
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        with self._host_slot(url):
+            if token:
+                token.check()
+            response = self.session.get(url, stream=True, **kwargs)
+            try:
+                if token:
+                    token.register(response)
+                response.raise_for_status()
+                yield response
+            finally:
+                if token:
+                    token.unregister(response)
+                response.close()
+
+http_client = HttpClient()
+
+def range_already_complete(error, offset):
+    """True if error is a 416 answer to a Range request from offset saying the file has exactly offset bytes."""
+    response = getattr(error, 'response', None)
+    return (response is not None and response.status_code == 416
+            and response.headers.get('Content-Range') == f'bytes */{offset}')
+
+# --- Download Manager ---
+class BandwidthLimiter:
+    """
+    Token bucket shared by all downloads. consume() blocks until the bytes fit in
+    the budget; a rate of 0 means unlimited. Up to one second of unused budget can
+    be saved up as burst.
+    """
+    def __init__(self, bytes_per_second=0):
+        self.rate = bytes_per_second
+        self.tokens = 0.0
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def set_rate(self, bytes_per_second):
+        with self.lock:
+            self.rate = bytes_per_second
+            self.tokens = 0.0
+
+    def consume(self, n):
+        with self.lock:
+            if self.rate <= 0:
+                return
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            self.tokens -= n # May go negative; whoever overdraws waits the debt off
+            wait = -self.tokens / self.rate
+        if wait > 0:
+            time.sleep(wait)
+
+class DownloadJob:
+    """One queued or running download. Progress fields are updated by the worker thread."""
+    def __init__(self, url, dest, on_progress, on_finished, on_chunk=None):
+        self.url = url
+        self.dest = Path(dest)
+        self.on_progress = on_progress
+        self.on_finished = on_finished
+        self.on_chunk = on_chunk
+        self.token = CancelToken()
+        self.downloaded = 0
+        self.total = None
+        self.bytes_per_second = 0.0
+
+    @property
+    def part_path(self):
+        return self.dest.with_name(self.dest.name + '.part')
+
+    @property
+    def cancelled(self):
+        return self.token.cancelled
+
+    @property
+    def fraction(self):
+        """Completed fraction between 0 and 1, or None if the size is unknown."""
+        return self.downloaded / self.total if self.total else None
+
+    def cancel(self):
+        """Stops the job; a running transfer is aborted at its next chunk or socket read."""
+        self.token.cancel()
+
+class DownloadBatch:
+    """Several DownloadJobs shown and cancelled as one entry."""
+    def __init__(self):
+        self.jobs = []
+        self.succeeded = 0
+        self.failed = 0
+
+    @property
+    def done(self):
+        return self.succeeded + self.failed
+
+    @property
+    def bytes_per_second(self):
+        return sum(job.bytes_per_second for job in self.jobs)
+
+    def cancel(self):
+        for job in self.jobs:
+            job.cancel()
+
+class DownloadManager:
+    """
+    Downloads files on a fixed number of worker threads; further jobs wait in a queue.
+
+    Data is written to <dest>.part and renamed into place once complete, so the
+    wallpaper directory never contains half-written images. A .part file left by a
+    cancelled or failed download is resumed with an HTTP Range request. Callbacks run
+    on the worker thread: on_progress(job) at most every progress_interval seconds and
+    on_finished(job, error), where error is None on success. on_chunk(offset, chunk),
+    if given, sees every chunk as it is written. All transfers share one BandwidthLimiter.
+    """
+    def __init__(self, workers=DOWNLOAD_WORKERS, client=http_client, progress_interval=0.5, bytes_per_second=0):
+        self.client = client
+        self.progress_interval = progress_interval
+        self.limiter = BandwidthLimiter(bytes_per_second)
+        self.queue = queue.Queue()
+        for _ in range(workers):
+            threading.Thread(target=self._worker, daemon=True).start()
+
+    def submit(self, url, dest, on_progress=None, on_finished=None, on_chunk=None):
+        """Queues a download of url to dest and returns its DownloadJob."""
+        job = DownloadJob(url, dest, on_progress, on_finished, on_chunk)
+        self.queue.put(job)
+        return job
+
+    def _worker(self):
+        while True:
+            job = self.queue.get()
+            error = None
+            try:
+                if job.cancelled:
+                    raise RequestCancelled()
+                self._download(job)
+            except RequestCancelled as e:
+                error = e
+            except Exception as e:
+                error = RequestCancelled() if job.cancelled else e
+            job.bytes_per_second = 0.0
+            if job.on_finished:
+                job.on_finished(job, error)
+
+    def _download(self, job, allow_resume=True):
+        part_path = job.part_path
+        offset = part_path.stat().st_size if allow_resume and part_path.exists() else 0
+        headers = {'Range': f'bytes={offset}-'} if offset else {}
+        try:
+            with self.client.stream(job.url, token=job.token, headers=headers) as response:
+                if response.status_code != 206:
+                    offset = 0 # Server sent the whole file
+                length = response.headers.get('Content-Length')
+                job.total = offset + int(length) if length else None
+                job.downloaded = offset
+                self._write_chunks(job, response, part_path, 'ab' if offset else 'wb')
+        except requests.exceptions.HTTPError as e:
+            if offset and range_already_complete(e, offset):
+                job.total = job.downloaded = offset # Fetched earlier, e.g. by the preview
+            elif offset and e.response is not None and e.response.status_code == 416:
+                part_path.unlink(missing_ok=True) # The partial file doesn't match the remote one
+                return self._download(job, allow_resume=False)
+            else:
+                raise
+        os.replace(part_path, job.dest)
+
+    def _write_chunks(self, job, response, part_path, mode):
+        window_start = time.monotonic()
+        window_bytes = 0
+        with open(part_path, mode) as f:
+            for chunk in response.iter_content(chunk_size=65536):
+                if job.cancelled:
+                    raise RequestCancelled()
+                f.write(chunk)
+                if job.on_chunk:
+                    job.on_chunk(job.downloaded, chunk)
+                self.limiter.consume(len(chunk))
+                job.downloaded += len(chunk)
+                window_bytes += len(chunk)
+                elapsed = time.monotonic() - window_start
+                if elapsed >= self.progress_interval:
+                    job.bytes_per_second = window_bytes / elapsed
+                    window_start, window_bytes = time.monotonic(), 0
+                    if job.on_progress:
+                        job.on_progress(job)
+
+# --- Online Preview ---
+class OnlinePreview:
+    """
+    Streams a full-size online image to disk and into a GdkPixbuf.PixbufLoader.
 
+    The loader is told to scale down to max_width x max_height as soon as the header
+    is parsed, so an 8K original is decoded at dialog size while it downloads and
+    the full-resolution pixels never sit in memory. on_update(texture) runs on the
+    main thread with whatever has been decoded, at most every update_interval_ms.
+    The bytes are written to path; a file left by an earlier preview is fed from
+    disk and resumed with a Range request. hand_off() stops the stream so a
+    DownloadJob can take over the file; passing feed as its on_chunk keeps the
+    preview filling in from the download.
+    """
+    def __init__(self, url, path, max_width, max_height, on_update, client=http_client, update_interval_ms=100):
+        self.url = url
+        self.path = Path(path)
+        self.max_width = max_width
+        self.max_height = max_height
+        self.on_update = on_update
+        self.client = client
+        self.update_interval_ms = update_interval_ms
+        self.token = CancelToken()
+        self.lock = threading.RLock()
+        self.loader = GdkPixbuf.PixbufLoader()
+        self.loader.connect('size-prepared', self._on_size_prepared)
+        self.fed = 0
+        self.handed_off = False
+        self.closed = False
+        self.update_pending = False
+
+    def _on_size_prepared(self, loader, width, height):
+        scale = min(self.max_width / width, self.max_height / height, 1.0)
+        if scale < 1.0:
+            loader.set_size(max(1, round(width * scale)), max(1, round(height * scale)))
+
+    def feed(self, offset, chunk):
+        """Decodes the part of chunk, found at offset in the file, that the loader has not seen yet. Thread-safe."""
+        with self.lock:
+            skip = self.fed - offset
+            if self.closed or skip < 0 or skip >= len(chunk):
+                return
+            try:
+                self.loader.write(chunk[skip:] if skip else chunk)
+            except GLib.Error as e:
+                print(f"Error decoding preview of {self.url}: {e}")
+                self._close_loader()
+                return
+            self.fed += len(chunk) - skip
+            self._schedule_update()
+
+    def run(self):
+        """
+        Streams the image. Blocking. Returns True once the whole file has been loaded,
+        False if hand_off() was called first. Raises RequestCancelled after cancel().
+        """
+        offset = 0
+        if self.path.exists():
+            with open(self.path, 'rb') as f:
+                while chunk := f.read(65536):
+                    self.token.check()
+                    self.feed(offset, chunk)
+                    offset += len(chunk)
+        headers = {'Range': f'bytes={offset}-'} if offset else {}
+        try:
+            with self.client.stream(self.url, token=self.token, headers=headers) as response:
+                if response.status_code != 206:
+                    offset = 0 # Server sent the whole file; feed() skips what it already has
+                with open(self.path, 'ab' if offset else 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=65536):
+                        self.token.check()
+                        with self.lock:
+                            if self.handed_off:
+                                return False
+                            f.write(chunk)
+                            f.flush() # The file must match what was fed when it is handed off
+                            self.feed(offset, chunk)
+                        offset += len(chunk)
+        except requests.exceptions.HTTPError as e:
+            if not (offset and range_already_complete(e, offset)):
+                raise
+        self.finish()
+        return True
+
+    def hand_off(self):
+        """Stops writing to path, leaving the loader open for feed(). Returns whether the stream was still running."""
+        with self.lock:
+            running = not (self.handed_off or self.closed)
+            self.handed_off = True
+            return running
+
+    def finish(self):
+        """Closes the loader once all bytes were fed and shows the final image."""
+        with self.lock:
+            if not self.closed:
+                self._close_loader()
+                self._schedule_update()
+
+    def cancel(self):
+        """Aborts the stream and stops decoding, e.g. when the dialog closes."""
+        self.token.cancel()
+        with self.lock:
+            if not self.closed:
+                self._close_loader()
+
+    def _close_loader(self):
+        self.closed = True
+        try:
+            self.loader.close()
+        except GLib.Error:
+            pass # Truncated images still show what was decoded
+
+    def _schedule_update(self):
+        if not self.update_pending:
+            self.update_pending = True
+            GLib.timeout_add(self.update_interval_ms, self._deliver_update)
+
+    def _deliver_update(self):
+        with self.lock:
+            self.update_pending = False
+            pixbuf = self.loader.get_pixbuf()
+            texture = Gdk.Texture.new_for_pixbuf(pixbuf) if pixbuf else None
+        if texture and not self.token.cancelled:
+            self.on_update(texture)
+        return False # For GLib.timeout_add
+
+class PendingFetch:
+    """A thumbnail download in progress; other callers for the same wall_id wait for it."""
+    def __init__(self):
+        self.done = threading.Event()
+        self.path = None
+        self.error = None
+
+# --- Online Thumbnail Cache ---
+class OnlineThumbnailCache:
+    """
+    Disk cache of Wallhaven thumbnails keyed by wall_id.
+
+    Entries fetched within fresh_seconds are served without touching the network.
+    Older ones are revalidated with If-None-Match / If-Modified-Since, so an unchanged
+    thumbnail costs a 304 instead of a download. Least recently used files are evicted
+    once the cache grows past max_bytes. Concurrent fetches of the same wall_id (a
+    prefetch and a grid cell) share one transfer. Cache hits only update times in
+    memory; they are written back with the next download or by flush().
+    """
+    def __init__(self, cache_dir, client=http_client, max_bytes=ONLINE_THUMBNAIL_CACHE_MB * 1024 * 1024,
+                 fresh_seconds=ONLINE_THUMBNAIL_FRESH_SECONDS):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.client = client
+        self.max_bytes = max_bytes
+        self.fresh_seconds = fresh_seconds
+        self.lock = threading.Lock()
+        self.inflight = {} # wall_id -> PendingFetch
+        self.touched = set() # wall_ids whose atime or validation time is not written yet
+        self.conn = sqlite3.connect(str(self.cache_dir / 'index.db'), check_same_thread=False)
+        self.conn.execute('''CREATE TABLE IF NOT EXISTS thumbs (wall_id TEXT PRIMARY KEY, name TEXT, etag TEXT,
+                             last_modified TEXT, validated REAL, atime REAL, bytes INTEGER)''')
+        self.conn.commit()
+        self.entries = {row[0]: list(row[1:]) for row in self.conn.execute("SELECT * FROM thumbs")}
+        self.total_bytes = sum(entry[5] for entry in self.entries.values())
+
+    def fetch(self, wall_id, url, token=None):
+        """
+        Returns the path of an up to date copy of the thumbnail, downloading it if needed.
+        If the same wall_id is already being fetched, waits for that transfer instead;
+        should it be cancelled, the next waiter fetches it itself. Blocking.
+        """
+        while True:
+            with self.lock:
+                pending = self.inflight.get(wall_id)
+                if pending is None:
+                    pending = self.inflight[wall_id] = PendingFetch()
+                    break
+            while not pending.done.wait(0.1):
+                if token:
+                    token.check()
+            if pending.error is None:
+                return pending.path
+            if not isinstance(pending.error, RequestCancelled):
+                raise pending.error
+            if token:
+                token.check()
+
+        try:
+            pending.path = self._fetch(wall_id, url, token)
+            return pending.path
+        except BaseException as e:
+            pending.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.inflight[wall_id]
+            pending.done.set()
+
+    def _fetch(self, wall_id, url, token):
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(wall_id)
+            if entry:
+                entry[4] = now
+        path = self.cache_dir / entry[0] if entry else None
+        if entry and path.exists():
+            if now - entry[3] < self.fresh_seconds:
+                with self.lock:
+                    self.touched.add(wall_id)
+                return path
+            headers = {}
+            if entry[1]:
+                headers['If-None-Match'] = entry[1]
+            if entry[2]:
+                headers['If-Modified-Since'] = entry[2]
+            response = self.client.get(url, token=token, headers=headers)
+            if response.status_code == 304:
+                with self.lock:
+                    entry[3] = now
+                    self.touched.add(wall_id)
+                return path
+        else:
+            response = self.client.get(url, token=token)
+
+        name = wall_id + (Path(urlsplit(url).path).suffix or '.jpg')
+        path = self.cache_dir / name
+        tmp = tempfile.NamedTemporaryFile(dir=self.cache_dir, prefix=name + '.', suffix='.part', delete=False)
+        try:
+            with tmp:
+                tmp.write(response.content)
+            os.replace(tmp.name, path)
+        except BaseException:
+            try:
+                os.unlink(tmp.name)
+            except OSError:
+                pass
+            raise
+        self._save(wall_id, [name, response.headers.get('ETag'), response.headers.get('Last-Modified'),
+                             now, now, len(response.content)])
+        self._evict()
+        return path
+
+    def _save(self, wall_id, entry):
+        """Records a downloaded thumbnail; pending times of other entries go into the same commit."""
+        with self.lock:
+            old = self.entries.get(wall_id)
+            self.total_bytes += entry[5] - (old[5] if old else 0)
+            self.entries[wall_id] = entry
+            self.touched.discard(wall_id)
+            self._write_touched()
+            self.conn.execute("INSERT OR REPLACE INTO thumbs VALUES (?, ?, ?, ?, ?, ?, ?)", (wall_id, *entry))
+            self.conn.commit()
+
+    def _write_touched(self):
+        """Queues the pending atime and validation updates. Call with lock held."""
+        rows = [(self.entries[w][3], self.entries[w][4], w) for w in self.touched if w in self.entries]
+        self.touched.clear()
+        self.conn.executemany("UPDATE thumbs SET validated = ?, atime = ? WHERE wall_id = ?", rows)
+
+    def flush(self):
+        """Writes the times of entries used since the last download back to the index."""
+        with self.lock:
+            if self.touched:
+                self._write_touched()
+                self.conn.commit()
+
+    def _evict(self):
+        with self.lock:
+            if self.total_bytes <= self.max_bytes:
+                return
+            doomed = []
+            for wall_id, entry in sorted(self.entries.items(), key=lambda kv: kv[1][4]):
+                if self.total_bytes <= self.max_bytes:
+                    break
+                doomed.append((wall_id, entry[0]))
+                self.total_bytes -= entry[5]
+                del self.entries[wall_id]
+            self.conn.executemany("DELETE FROM thumbs WHERE wall_id = ?", [(wall_id,) for wall_id, _ in doomed])
+            self.conn.commit()
+        for _, name in doomed:
+            try:
+                (self.cache_dir / name).unlink()
+            except OSError:
+                pass
+
+    def clear(self):
+        with self.lock:
+            names = [entry[0] for entry in self.entries.values()]
+            self.entries.clear()
+            self.touched.clear()
+            self.total_bytes = 0
+            self.conn.execute("DELETE FROM thumbs")
+            self.conn.commit()
+        for name in names:
+            try:
+                (self.cache_dir / name).unlink()
+            except OSError:
+                pass
+
+# --- Search Result Cache ---
+class SearchCache:
+    """
+    Persistent cache of Wallhaven search pages keyed by the full parameter set.
+
+    lookup() returns entries of any age together with whether they are still within
+    the TTL, so callers can show stale results at once and revalidate in the
+    background. Entries are written to a JSON file and the oldest are dropped
+    beyond max_entries.
+    """
+    def __init__(self, path, ttl_seconds, max_entries=200):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        try:
+            with open(self.path) as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    @staticmethod
+    def key_for(params):
+        """Cache key for a parameter dict. The API key is left out so it is never written to disk."""
+        return json.dumps({k: v for k, v in params.items() if k != 'apikey'}, sort_keys=True)
+
+    def lookup(self, params):
+        """Returns (results, fresh) for a cached search, or None. results is shaped like search_wallhaven's."""
+        with self.lock:
+            entry = self.entries.get(self.key_for(params))
+        if not entry:
+            return None
+        results = {"items": items_from_results(entry['data']), "meta": entry.get('meta', {})}
+        return results, time.time() - entry['time'] < self.ttl_seconds
+
+    def store(self, params, data, meta):
+        """Records the raw result list and pagination meta of a search and writes the cache file."""
+        with self.lock:
+            self.entries[self.key_for(params)] = {'time': time.time(), 'data': data, 'meta': meta}
+            if len(self.entries) > self.max_entries:
+                oldest = sorted(self.entries, key=lambda k: self.entries[k]['time'])
+                for key in oldest[:len(self.entries) - self.max_entries]:
+                    del self.entries[key]
+            tmp_path = self.path.with_name(self.path.name + '.part')
+            try:
+                with open(tmp_path, 'w') as f:
+                    json.dump(self.entries, f)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                print(f"Could not write search cache: {e}")
+
+    def clear(self):
+        with self.lock:
+            self.entries = {}
+            try:
+                self.path.unlink()
+            except OSError:
+                pass
+
+def build_search_params(query: str, api_key: str, sfw: bool, sketchy: bool, nsfw: bool, general: bool, anime: bool, people: bool, resolution: str, atleast: str, ratios: str, page: int = 1):
+    """
+    Builds the Wallhaven search API parameters.
+    """
     purity = f"{'1' if sfw else '0'}{'1' if sketchy else '0'}{'1' if nsfw else '0'}"
     categories = f"{'1' if general else '0'}{'1' if anime else '0'}{'1' if people else '0'}"
 
@@ -26,27 +685,40 @@ def search_wallhaven(query: str, api_key: str, sfw: bool, sketchy: bool, nsfw: b
         params['atleast'] = atleast
     if ratios:
         params['ratios'] = ratios
-    
-    print(f"Triggering search with purity: SFW={sfw}, Sketchy={sketchy}, NSFW={nsfw}")
-    print(f"Triggering search with categories: General={general}, Anime={anime}, People={people}")
-    print(f"Wallhaven API params: {params}")
+    return params
+
+def items_from_results(data):
+    """Creates OnlineWallpaperItems from the "data" list of a search response."""
+    return [
+        OnlineWallpaperItem(
+            wall_id=wall.get("id"),
+            thumbnail_url=wall.get("thumbs", {}).get("small"),
+            full_url=wall.get("path"),
+            purity=wall.get("purity"),
+            resolution=wall.get("resolution")
+        )
+        for wall in data
+    ]
+
+def search_wallhaven(params, cache=None, token=None):
+    """
+    Searches Wallhaven for wallpapers. Returns {"items": [...], "meta": {...}} where meta
+    holds the API's pagination info (current_page, last_page, ...), or {"error": ...}.
+    Successful results are recorded in cache if given. Raises RequestCancelled if
+    token is cancelled while the request is running.
+    """
+    if not params.get("apikey"):
+        return {"error": "API key is not set."}
+
+    print(f"Wallhaven API params: { {k: v for k, v in params.items() if k != 'apikey'} }")
     try:
-        response = requests.get("https://wallhaven.cc/api/v1/search", params=params)
-        response.raise_for_status()  # Raise an exception for bad status codes
-        data = response.json()
-        
-        results = []
-        for wall in data.get("data", []):
-            item = OnlineWallpaperItem(
-                wall_id=wall.get("id"),
-                thumbnail_url=wall.get("thumbs", {}).get("small"),
-                full_url=wall.get("path"),
-                purity=wall.get("purity"),
-                resolution=wall.get("resolution")
-            )
-            results.append(item)
-        return results
-
-    except requests.exceptions.RequestException as e:
-        return {"error": str(e)}
+        response = http_client.get(WALLHAVEN_SEARCH_URL, token=token, params=params)
+        payload = response.json()
+        data = payload.get("data", [])
+        meta = payload.get("meta") or {}
+        if cache:
+            cache.store(params, data, meta)
+        return {"items": items_from_results(data), "meta": meta}
 
+    except (requests.exceptions.RequestException, ValueError) as e:
+        return {"error": str(e)}
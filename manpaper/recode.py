@@ -0,0 +1,486 @@
+import os
+import re
+import json
+import time
+import shutil
+import threading
+import subprocess
+from collections import deque, namedtuple
+from fractions import Fraction
+from pathlib import Path
+from gi.repository import GLib
+
+from .config import RECODE_NICENESS, RECODE_SAMPLE_SECONDS
+
+class RecodeProfile(namedtuple('RecodeProfile', ['name', 'codec', 'preset', 'crf', 'gop', 'pix_fmt', 'tune'])):
+    """Encoder settings for recoded live wallpapers."""
+    def output_args(self, suffix, closed_gop=False):
+        """
+        ffmpeg video output options for a file with the given suffix. GIFs keep ffmpeg's
+        GIF encoder. closed_gop makes every GOP self-contained with no scene-cut
+        keyframes, so a looping player can jump back to the start without flushing.
+        """
+        suffix = suffix.lower()
+        if suffix == '.gif':
+            return []
+        args = ['-c:v', self.codec, '-preset', self.preset, '-crf', str(self.crf),
+                '-g', str(self.gop), '-pix_fmt', self.pix_fmt]
+        if self.tune:
+            args += ['-tune', self.tune]
+        if closed_gop:
+            args += ['-sc_threshold', '0', '-flags', '+cgop']
+        if self.codec == 'libx265':
+            args += ['-x265-params', 'log-level=error:open-gop=0:scenecut=0' if closed_gop else 'log-level=error']
+            if suffix in ('.mp4', '.mov'):
+                args += ['-tag:v', 'hvc1'] # Lets players recognise HEVC in MP4
+        if suffix in ('.mp4', '.mov'):
+            args += ['-movflags', '+faststart']
+        return args
+
+# Wallpapers loop forever, so the GOP and decoder settings matter more than for one-off encodes
+RECODE_PROFILES = {
+    'balanced': RecodeProfile("Balanced", 'libx264', 'medium', 23, 240, 'yuv420p', None),
+    'fast-encode': RecodeProfile("Fast encode", 'libx264', 'veryfast', 23, 240, 'yuv420p', None),
+    'small-file': RecodeProfile("Small file", 'libx265', 'slow', 28, 240, 'yuv420p', None),
+    'cheap-decode': RecodeProfile("Cheap decode", 'libx264', 'fast', 20, 60, 'yuv420p', 'fastdecode'),
+}
+DEFAULT_RECODE_PROFILE = 'balanced'
+
+def probe_duration(path):
+    """Returns the duration of a media file in seconds according to ffprobe, or None."""
+    cmd = ['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of', 'default=nw=1:nk=1', str(path)]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+        return float(result.stdout.strip()) or None
+    except (FileNotFoundError, subprocess.CalledProcessError, ValueError):
+        return None
+
+VideoInfo = namedtuple('VideoInfo', ['width', 'height', 'fps', 'has_audio'])
+
+# Name endings of recoded files in a recoded/ folder; the rest of the stem is the original's
+VARIANT_SUFFIXES = ('_recoded', '_loop')
+
+def probe_video(path):
+    """Returns a VideoInfo for the first video stream of path according to ffprobe, or None."""
+    cmd = ['ffprobe', '-v', 'error', '-show_entries', 'stream=codec_type,width,height,avg_frame_rate', '-of', 'json', str(path)]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+        streams = json.loads(result.stdout).get('streams', [])
+        video = next(st for st in streams if st.get('codec_type') == 'video')
+        rate = video.get('avg_frame_rate', '0/0')
+        fps = float(Fraction(rate)) if not rate.endswith('/0') else 0.0
+        has_audio = any(st.get('codec_type') == 'audio' for st in streams)
+        return VideoInfo(int(video['width']), int(video['height']), fps, has_audio)
+    except (FileNotFoundError, subprocess.CalledProcessError, ValueError, KeyError, StopIteration):
+        return None
+
+def variant_key(path):
+    """
+    Groups a video with its recoded versions: recoded/<stem>_recoded.mp4 and
+    recoded/<stem>_loop.mp4 map to the same (directory, stem) as the <stem>.* they were made from.
+    """
+    path = Path(path)
+    if path.parent.name == 'recoded':
+        for suffix in VARIANT_SUFFIXES:
+            if path.stem.endswith(suffix):
+                return str(path.parent.parent), path.stem[:-len(suffix)]
+    return str(path.parent), path.stem
+
+def probe_keyframes(path):
+    """Returns the timestamps in seconds of the video keyframes in path, or an empty list."""
+    cmd = ['ffprobe', '-v', 'error', '-select_streams', 'v:0', '-skip_frame', 'nokey',
+           '-show_entries', 'frame=pts_time', '-of', 'csv=p=0', str(path)]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    except (FileNotFoundError, subprocess.CalledProcessError):
+        return []
+    times = []
+    for line in result.stdout.split():
+        try:
+            times.append(float(line.strip(',')))
+        except ValueError:
+            pass
+    return sorted(times)
+
+def loop_end(keyframes, duration):
+    """
+    Where to cut a clip so it loops on a keyframe boundary: the last keyframe in the
+    second half of the clip, or the full duration if there is none.
+    """
+    candidates = [t for t in keyframes if duration / 2 <= t < duration]
+    return candidates[-1] if candidates else duration
+
+def loop_filter_graph(end, crossfade, video_filter, with_audio):
+    """
+    Builds a -filter_complex graph producing [v] (and [a]) for a clip cut at end.
+    With a crossfade, the first crossfade seconds are blended over the tail, so the
+    last frame leads straight into the first and the loop is crossfade seconds shorter.
+    """
+    if crossfade <= 0:
+        graph = f"[0:v]trim=end={end},setpts=PTS-STARTPTS,{video_filter}[v]"
+        if with_audio:
+            graph += f";[0:a]atrim=end={end},asetpts=PTS-STARTPTS[a]"
+        return graph
+    graph = (f"[0:v]split[body][head];"
+             f"[body]trim=start={crossfade}:end={end},setpts=PTS-STARTPTS[vb];"
+             f"[head]trim=end={crossfade},setpts=PTS-STARTPTS[vh];"
+             f"[vb][vh]xfade=transition=fade:duration={crossfade}:offset={end - 2 * crossfade},{video_filter}[v]")
+    if with_audio:
+        graph += (f";[0:a]asplit[abody][ahead];"
+                  f"[abody]atrim=start={crossfade}:end={end},asetpts=PTS-STARTPTS[ab];"
+                  f"[ahead]atrim=end={crossfade},asetpts=PTS-STARTPTS[ah];"
+                  f"[ab][ah]acrossfade=d={crossfade}[a]")
+    return graph
+
+def playback_cost(info):
+    """Sort key for how much work playing a video takes: decoded pixels per second, then audio."""
+    return info.width * info.height * (info.fps or 30), info.has_audio
+
+def pick_variant(infos, with_audio):
+    """
+    Picks the cheapest to play of {path: VideoInfo or None}. With sound enabled,
+    variants without audio only count if none have it. Returns None if nothing is known.
+    """
+    known = {path: info for path, info in infos.items() if info}
+    if with_audio and any(info.has_audio for info in known.values()):
+        known = {path: info for path, info in known.items() if info.has_audio}
+    if not known:
+        return None
+    # On a tie the seamless loop wins
+    return min(known, key=lambda path: (*playback_cost(known[path]), not Path(path).stem.endswith('_loop')))
+
+def format_duration(seconds):
+    """Formats seconds as M:SS or H:MM:SS."""
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02}:{seconds:02}" if hours else f"{minutes}:{seconds:02}"
+
+class RecodeProgress:
+    """Latest values reported by ffmpeg -progress, mapped against the input duration."""
+    def __init__(self, duration=None):
+        self.duration = duration
+        self.started = time.monotonic()
+        self.frame = 0
+        self.fps = 0.0
+        self.speed = 0.0
+        self.out_time = 0.0
+
+    def update(self, key, value):
+        """Takes one key=value line. Values ffmpeg reports as N/A are ignored."""
+        try:
+            if key == 'frame':
+                self.frame = int(value)
+            elif key == 'fps':
+                self.fps = float(value)
+            elif key == 'speed':
+                self.speed = float(value.rstrip('x'))
+            elif key == 'out_time_us':
+                self.out_time = max(0.0, int(value) / 1_000_000)
+        except ValueError:
+            pass
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    @property
+    def fraction(self):
+        """Completed fraction between 0 and 1, or None without a duration."""
+        if not self.duration:
+            return None
+        return min(1.0, self.out_time / self.duration)
+
+    @property
+    def eta(self):
+        """Estimated seconds left, or None while there is nothing to go by."""
+        if not self.duration:
+            return None
+        remaining = max(0.0, self.duration - self.out_time)
+        if self.speed > 0:
+            return remaining / self.speed
+        if self.out_time > 0:
+            return remaining * self.elapsed / self.out_time
+        return None
+
+    def describe(self):
+        """Short status text, e.g. '42% · 1.8x · 3:12 left'."""
+        parts = []
+        if self.fraction is not None:
+            parts.append(f"{self.fraction * 100:.0f}%")
+        else:
+            parts.append(format_duration(self.out_time))
+        if self.speed > 0:
+            parts.append(f"{self.speed:.2f}x")
+        elif self.fps > 0:
+            parts.append(f"{self.fps:.0f} fps")
+        if self.eta is not None:
+            parts.append(f"{format_duration(self.eta)} left")
+        return " · ".join(parts)
+
+def append_recode_log(log_path, entry):
+    """Appends one finished recode to the JSON Lines throughput log."""
+    try:
+        with open(log_path, 'a') as f:
+            f.write(json.dumps(entry) + '\n')
+    except OSError as e:
+        print(f"Could not write recode log {log_path}: {e}")
+
+def measure_decode_cost(scheduler, job, path):
+    """CPU seconds ffmpeg spends decoding path, from its -benchmark report, or None."""
+    process = scheduler.popen(job, ['ffmpeg', '-nostdin', '-hide_banner', '-benchmark', '-i', str(path), '-f', 'null', '-'],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, errors='replace')
+    _, stderr = process.communicate()
+    match = re.search(r'utime=([\d.]+)s', stderr)
+    return float(match.group(1)) if process.returncode == 0 and match else None
+
+def compare_profiles(scheduler, job, input_path, video_filter, work_dir, sample_seconds=RECODE_SAMPLE_SECONDS):
+    """
+    Encodes the start of input_path with every profile on job's worker. Returns
+    (results, error_message); each result has the profile key, encode time, file
+    size and the share of one core needed to decode the sample in real time.
+    """
+    duration = probe_duration(input_path)
+    sample = min(sample_seconds, duration) if duration else sample_seconds
+    work_dir = Path(work_dir)
+    work_dir.mkdir(parents=True, exist_ok=True)
+    results = []
+    for key, profile in RECODE_PROFILES.items():
+        if job.cancelled:
+            return None, "Process was terminated."
+        sample_path = work_dir / f"sample-{key}.mp4"
+        command = ['-t', str(sample), '-i', str(input_path), '-vf', video_filter, *profile.output_args('.mp4'),
+                   '-an', '-threads', str(job.threads), '-y', str(sample_path)]
+        try:
+            success, error_message = scheduler.run_ffmpeg(job, command, input_path, sample, input_duration=duration)
+            if not success:
+                return None, error_message
+            encode_seconds = job.progress.elapsed
+            decode_seconds = measure_decode_cost(scheduler, job, sample_path)
+            results.append({
+                'profile': key,
+                'encode_seconds': encode_seconds,
+                'bytes': sample_path.stat().st_size,
+                'decode_load': decode_seconds / sample if decode_seconds is not None else None,
+            })
+        finally:
+            sample_path.unlink(missing_ok=True)
+    return results, None
+
+class RecodeJob:
+    """
+    One queued or running recode. kind says what to do with item, e.g. 'recode' or
+    'compare'. worker and threads are set when a worker picks it up; run() may leave
+    its outcome in result.
+    """
+    def __init__(self, item, kind='recode'):
+        self.item = item
+        self.kind = kind
+        self.result = None
+        self.worker = None
+        self.threads = 0
+        self.process = None
+        self.cancelled = False
+        self.progress = None
+
+    @property
+    def running(self):
+        return self.worker is not None
+
+# --- Recode Scheduler ---
+class RecodeScheduler:
+    """
+    Runs recodes on up to `workers` worker threads.
+
+    The thread budget (0 for one per CPU) is split evenly across the workers and
+    handed to each ffmpeg through -threads, so parallel encodes share the machine
+    instead of each spawning a thread per core. Encoders are started under nice and,
+    when available, ionice's idle class so the desktop stays responsive.
+
+    run(job) does the work on a worker thread and returns (success, error_message);
+    it should start its process with popen() or run_ffmpeg(). on_finished(job, success,
+    error_message), on_changed() and on_progress(job) run on the main thread;
+    on_finished is not called for cancelled jobs. Finished encodes are appended to
+    log_path so throughput can be compared across settings.
+    """
+    def __init__(self, run, on_finished, on_changed, on_progress=None, workers=1, thread_budget=0, log_path=None):
+        self.run = run
+        self.on_finished = on_finished
+        self.on_changed = on_changed
+        self.on_progress = on_progress
+        self.log_path = log_path
+        self.workers = 0
+        self.thread_budget = thread_budget
+        self.queue = deque()
+        self.running = {} # worker index -> RecodeJob
+        self.threads_started = 0
+        self.cond = threading.Condition()
+        self.set_workers(workers)
+
+    def set_workers(self, workers):
+        """Changes the number of concurrent jobs. Running jobs above the new limit are finished first."""
+        with self.cond:
+            self.workers = max(1, workers)
+            while self.threads_started < self.workers:
+                threading.Thread(target=self._worker, args=(self.threads_started,), daemon=True).start()
+                self.threads_started += 1
+            self.cond.notify_all()
+
+    def set_thread_budget(self, thread_budget):
+        """Changes the total ffmpeg threads; applies to jobs started from now on."""
+        with self.cond:
+            self.thread_budget = thread_budget
+
+    def threads_per_job(self):
+        budget = self.thread_budget or os.cpu_count() or 1
+        return max(1, budget // self.workers)
+
+    def submit(self, item, kind='recode'):
+        """Queues a job of kind for item. Returns its RecodeJob, or None if it is already queued or running."""
+        with self.cond:
+            if self.find(item, kind):
+                return None
+            job = RecodeJob(item, kind)
+            self.queue.append(job)
+            self.cond.notify_all()
+        GLib.idle_add(self._changed)
+        return job
+
+    def find(self, item, kind='recode'):
+        """Returns the queued or running job of kind for item, or None."""
+        with self.cond:
+            for job in [*self.running.values(), *self.queue]:
+                if job.item == item and job.kind == kind:
+                    return job
+        return None
+
+    def snapshot(self):
+        """Returns (running jobs sorted by worker, queued jobs)."""
+        with self.cond:
+            return sorted(self.running.values(), key=lambda job: job.worker), list(self.queue)
+
+    def cancel(self, job):
+        """Drops job from the queue or terminates its process."""
+        with self.cond:
+            self._cancel(job)
+        GLib.idle_add(self._changed)
+
+    def cancel_all(self):
+        with self.cond:
+            for job in [*self.running.values(), *self.queue]:
+                self._cancel(job)
+        GLib.idle_add(self._changed)
+
+    def _cancel(self, job):
+        """Call with cond held."""
+        job.cancelled = True
+        if job in self.queue:
+            self.queue.remove(job)
+        elif job.process:
+            try:
+                job.process.terminate()
+            except ProcessLookupError:
+                pass
+
+    def popen(self, job, command, **kwargs):
+        """Starts command for job at low CPU and I/O priority. Terminated right away if job was cancelled."""
+        prefix = []
+        if shutil.which('nice'):
+            prefix += ['nice', '-n', str(RECODE_NICENESS)]
+        if shutil.which('ionice'):
+            prefix += ['ionice', '-c', '3']
+        process = subprocess.Popen(prefix + command, **kwargs)
+        with self.cond:
+            job.process = process
+            if job.cancelled:
+                process.terminate()
+        return process
+
+    def run_ffmpeg(self, job, command, input_path, duration=None, input_duration=None):
+        """
+        Runs an ffmpeg command (arguments after 'ffmpeg', output path last) for job,
+        following its -progress output to keep job.progress current. Blocking.
+        duration is the length being encoded; pass the length of the whole input as
+        input_duration when that is only part of it, e.g. a sample, so the log counts
+        only the input bytes actually read. Returns (success, error_message).
+        """
+        job.progress = RecodeProgress(duration)
+        process = self.popen(job, ['ffmpeg', '-nostdin', '-hide_banner', '-nostats', '-progress', 'pipe:1'] + command,
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, errors='replace')
+        # Drain stderr on its own thread so a chatty encoder can't fill the pipe and stall
+        stderr_tail = deque(maxlen=20)
+        stderr_thread = threading.Thread(target=lambda: stderr_tail.extend(process.stderr), daemon=True)
+        stderr_thread.start()
+        for line in process.stdout:
+            key, _, value = line.strip().partition('=')
+            if key == 'progress':
+                if self.on_progress:
+                    GLib.idle_add(self._progress, job)
+            else:
+                job.progress.update(key, value)
+        return_code = process.wait()
+        stderr_thread.join()
+        if return_code != 0:
+            return False, ''.join(stderr_tail) or "Process was terminated or failed."
+        if self.log_path:
+            self._log(job, command, input_path, input_duration)
+        return True, None
+
+    def _log(self, job, command, input_path, input_duration=None):
+        progress = job.progress
+        elapsed = progress.elapsed
+        output_path = command[-1]
+        try:
+            input_bytes, output_bytes = os.path.getsize(input_path), os.path.getsize(output_path)
+        except OSError:
+            input_bytes = output_bytes = None
+        if input_bytes and input_duration and progress.duration and progress.duration < input_duration:
+            input_bytes = round(input_bytes * progress.duration / input_duration)
+        append_recode_log(self.log_path, {
+            'finished': time.time(),
+            'input': str(input_path),
+            'output': str(output_path),
+            'command': command,
+            'threads': job.threads,
+            'workers': self.workers,
+            'duration': progress.duration,
+            'frames': progress.frame,
+            'elapsed': round(elapsed, 2),
+            'fps': round(progress.frame / elapsed, 2) if elapsed else None,
+            'speed': round(progress.duration / elapsed, 3) if progress.duration and elapsed else None,
+            'input_bytes': input_bytes,
+            'output_bytes': output_bytes,
+        })
+
+    def _progress(self, job):
+        if not job.cancelled:
+            self.on_progress(job)
+        return False # For GLib.idle_add
+
+    def _worker(self, index):
+        while True:
+            with self.cond:
+                while index >= self.workers or not self.queue:
+                    self.cond.wait()
+                job = self.queue.popleft()
+                job.worker = index
+                job.threads = self.threads_per_job()
+                self.running[index] = job
+            GLib.idle_add(self._changed)
+            try:
+                success, error_message = self.run(job)
+            except Exception as e:
+                success, error_message = False, str(e)
+            with self.cond:
+                del self.running[index]
+                job.process = None
+            GLib.idle_add(self._deliver, job, success, error_message)
+
+    def _deliver(self, job, success, error_message):
+        if not job.cancelled:
+            self.on_finished(job, success, error_message)
+        self.on_changed()
+        return False # For GLib.idle_add
+
+    def _changed(self):
+        self.on_changed()
+        return False # For GLib.idle_add
@@ -0,0 +1,333 @@
+import os
+import time
+import heapq
+import sqlite3
+import hashlib
+import itertools
+import threading
+from pathlib import Path
+
+from .config import THUMBNAIL_FINGERPRINT_BYTES
+
+# Lower values run first
+PRIORITY_VISIBLE = 0
+PRIORITY_BACKGROUND = 10
+
+class ThumbnailJob:
+    """A queued thumbnail generation, shared by everyone who asked for the same key."""
+    def __init__(self, key, func, args):
+        self.key = key
+        self.func = func
+        self.args = args
+        self.requests = {} # priority -> number of outstanding requests
+        self.running = False
+
+    @property
+    def priority(self):
+        return min(self.requests) if self.requests else None
+
+# --- Thumbnail Scheduler ---
+class ThumbnailScheduler:
+    """
+    Runs thumbnail jobs on a fixed pool of worker threads.
+
+    Jobs are deduplicated by key and picked by priority, so cells that are on screen
+    go before background work. A job that has not started yet is dropped once every
+    request for it has been cancelled. Background jobs run on a single extra worker
+    whose thread is reniced to 19, so pre-warming a large library, including the
+    in-process image decodes, only uses spare CPU and I/O. They can also be held back
+    for a while with hold_background(), e.g. while the user is scrolling.
+    """
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 2
+        self.heaps = {False: [], True: []} # Keyed by whether the entries are background priority
+        self.jobs = {}
+        self.seq = itertools.count()
+        self.cond = threading.Condition()
+        self.background_hold_until = 0.0
+        self.local = threading.local()
+        for _ in range(self.workers):
+            threading.Thread(target=self._worker, args=(False,), daemon=True).start()
+        threading.Thread(target=self._worker, args=(True,), daemon=True).start()
+
+    def _push(self, priority, job):
+        """Queues a heap entry for job at priority. Call with cond held."""
+        heapq.heappush(self.heaps[priority >= PRIORITY_BACKGROUND], (priority, next(self.seq), job))
+        self.cond.notify_all()
+
+    def submit(self, key, func, *args, priority=PRIORITY_VISIBLE):
+        """
+        Requests func(*args) to run for key. Returns (job, created); created is False
+        when the request joined a job that was already queued or running.
+        """
+        with self.cond:
+            job = self.jobs.get(key)
+            created = job is None
+            if created:
+                job = ThumbnailJob(key, func, args)
+                self.jobs[key] = job
+            job.requests[priority] = job.requests.get(priority, 0) + 1
+            if not job.running and job.priority == priority:
+                self._push(priority, job)
+            return job, created
+
+    def cancel(self, job, priority=PRIORITY_VISIBLE):
+        """
+        Withdraws one request for job. Returns True if that dropped the job entirely,
+        False if it is already running, finished or still wanted by someone else.
+        """
+        with self.cond:
+            if job.running or self.jobs.get(job.key) is not job or priority not in job.requests:
+                return False
+            job.requests[priority] -= 1
+            if job.requests[priority] <= 0:
+                del job.requests[priority]
+            if not job.requests:
+                del self.jobs[job.key]
+                return True
+            self._push(job.priority, job)
+            return False
+
+    def is_pending(self, job):
+        """True while job is queued or running."""
+        with self.cond:
+            return self.jobs.get(job.key) is job
+
+    def hold_background(self, seconds):
+        """Keeps background jobs from starting for the next few seconds."""
+        with self.cond:
+            self.background_hold_until = max(self.background_hold_until, time.monotonic() + seconds)
+
+    def in_background_job(self):
+        """True when called from a worker that is running a background priority job."""
+        return getattr(self.local, 'priority', PRIORITY_VISIBLE) >= PRIORITY_BACKGROUND
+
+    def _next_job(self, background):
+        """
+        Pops the best runnable job from the visible or the background heap, skipping
+        stale entries. Call with cond held.
+        Returns (job, None) or (None, seconds to wait before looking again).
+        """
+        heap = self.heaps[background]
+        while heap:
+            priority, _, job = heap[0]
+            if self.jobs.get(job.key) is not job or job.running or job.priority != priority:
+                heapq.heappop(heap)
+                continue
+            hold = self.background_hold_until - time.monotonic()
+            if background and hold > 0:
+                return None, hold
+            heapq.heappop(heap)
+            return job, None
+        return None, None
+
+    def _worker(self, background):
+        if background:
+            try:
+                os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19) # Linux: renices this thread only
+            except (AttributeError, OSError) as e:
+                print(f"Could not lower background thumbnail priority: {e}")
+        while True:
+            with self.cond:
+                job, wait = self._next_job(background)
+                while job is None:
+                    self.cond.wait(wait)
+                    job, wait = self._next_job(background)
+                job.running = True
+                self.local.priority = job.priority
+            try:
+                job.func(*job.args)
+            except Exception as e:
+                print(f"Thumbnail job failed for {job.key}: {e}")
+            finally:
+                with self.cond:
+                    if self.jobs.get(job.key) is job:
+                        del self.jobs[job.key]
+
+def content_digest(path, size):
+    """
+    Fingerprints a file by its size and the first and last THUMBNAIL_FINGERPRINT_BYTES.
+    Copies of the same wallpaper get the same digest without hashing whole videos.
+    """
+    digest = hashlib.sha1(str(size).encode())
+    with open(path, 'rb') as f:
+        digest.update(f.read(THUMBNAIL_FINGERPRINT_BYTES))
+        if size > 2 * THUMBNAIL_FINGERPRINT_BYTES:
+            f.seek(-THUMBNAIL_FINGERPRINT_BYTES, os.SEEK_END)
+            digest.update(f.read(THUMBNAIL_FINGERPRINT_BYTES))
+    return digest.hexdigest()
+
+# --- Thumbnail Manifest ---
+class ThumbnailManifest:
+    """
+    Maps sources (file paths or URLs) to content-addressed thumbnails in cache_dir.
+
+    Each source is recorded with the size and mtime it had when its digest was taken,
+    so a lookup compares against the library index instead of stat-ing anything.
+    Thumbnails are stored as <digest>.jpg and shared by identical files.
+    The manifest is kept in memory and written through to SQLite; access times
+    are only written back by collect_garbage() so lookups stay cheap.
+    """
+    def __init__(self, cache_dir, db_path):
+        self.cache_dir = Path(cache_dir)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS sources (source TEXT PRIMARY KEY, size INTEGER, mtime INTEGER, digest TEXT);
+            CREATE TABLE IF NOT EXISTS thumbs (digest TEXT PRIMARY KEY, bytes INTEGER, atime REAL);
+        ''')
+        self.conn.commit()
+        self.sources = {source: (size, mtime, digest) for source, size, mtime, digest in self.conn.execute("SELECT * FROM sources")}
+        self.thumbs = {digest: (size, atime) for digest, size, atime in self.conn.execute("SELECT * FROM thumbs")}
+        self.touched = set()
+
+    def thumb_path(self, digest):
+        return self.cache_dir / f"{digest}.jpg"
+
+    def lookup(self, source, size, mtime):
+        """Returns the thumbnail path for an unchanged source, or None if it needs (re)generating."""
+        with self.lock:
+            entry = self.sources.get(source)
+            if not entry or entry[0] != size or entry[1] != mtime or entry[2] not in self.thumbs:
+                return None
+            digest = entry[2]
+            self.thumbs[digest] = (self.thumbs[digest][0], time.time())
+            self.touched.add(digest)
+            return self.thumb_path(digest)
+
+    def thumb_path_for_source(self, source):
+        """Returns the last known thumbnail path of a source, current or not."""
+        with self.lock:
+            entry = self.sources.get(source)
+        return self.thumb_path(entry[2]) if entry else None
+
+    def forget(self, source):
+        """
+        Drops a source whose thumbnail file turned out to be missing or unreadable,
+        together with that file, so the next lookup generates it again.
+        """
+        with self.lock:
+            entry = self.sources.pop(source, None)
+            if not entry:
+                return
+            digest = entry[2]
+            self.conn.execute("DELETE FROM sources WHERE source = ?", (source,))
+            if self.thumbs.pop(digest, None):
+                self.touched.discard(digest)
+                self.conn.execute("DELETE FROM thumbs WHERE digest = ?", (digest,))
+            self.conn.commit()
+        try:
+            self.thumb_path(digest).unlink()
+        except OSError:
+            pass
+
+    def has_thumb(self, digest):
+        with self.lock:
+            return digest in self.thumbs
+
+    def record(self, source, size, mtime, digest):
+        """Links source to digest, registering the thumbnail file if it is new."""
+        thumb_path = self.thumb_path(digest)
+        try:
+            thumb_bytes = thumb_path.stat().st_size
+        except OSError:
+            return
+        now = time.time()
+        with self.lock:
+            self.sources[source] = (size, mtime, digest)
+            self.conn.execute("INSERT OR REPLACE INTO sources VALUES (?, ?, ?, ?)", (source, size, mtime, digest))
+            if digest not in self.thumbs:
+                self.thumbs[digest] = (thumb_bytes, now)
+                self.conn.execute("INSERT OR REPLACE INTO thumbs VALUES (?, ?, ?)", (digest, thumb_bytes, now))
+            self.conn.commit()
+
+    def stale_sources(self, current):
+        """
+        Returns recorded sources whose thumbnails no longer match, given current
+        {source: (size, mtime)} from the library index. Sources missing from current,
+        or mapped to None (not indexed yet), are not included.
+        """
+        with self.lock:
+            return [source for source, (size, mtime, _) in self.sources.items()
+                    if current.get(source) not in (None, (size, mtime))]
+
+    def total_bytes(self):
+        """Disk space used by the recorded thumbnails."""
+        with self.lock:
+            return sum(size for size, _ in self.thumbs.values())
+
+    def collect_garbage(self, live_sources, max_bytes, grace_seconds=60):
+        """
+        Trims the cache. live_sources maps the library's sources to their current
+        (size, mtime) as for stale_sources(). Forgets sources not in it and stale ones,
+        deletes thumbnails no source refers to and stray files the manifest does not
+        know (older than grace_seconds, so in-progress writes survive), then evicts
+        least recently used thumbnails until the cache fits in max_bytes.
+        An empty or None live_sources means the library could not be read (no
+        directory set, or an unmounted drive), so no source is treated as orphaned.
+        Returns (files_removed, bytes_freed).
+        """
+        stale = self.stale_sources(live_sources) if live_sources else []
+        with self.lock:
+            if live_sources:
+                for source in [s for s in self.sources if s not in live_sources]:
+                    del self.sources[source]
+            for source in stale:
+                self.sources.pop(source, None)
+
+            referenced = {digest for _, _, digest in self.sources.values()}
+            doomed = {digest for digest in self.thumbs if digest not in referenced}
+            total = sum(size for digest, (size, _) in self.thumbs.items() if digest not in doomed)
+            for digest, (size, _) in sorted(self.thumbs.items(), key=lambda kv: kv[1][1]):
+                if total <= max_bytes:
+                    break
+                if digest not in doomed:
+                    doomed.add(digest)
+                    total -= size
+
+            freed = sum(self.thumbs.pop(digest)[0] for digest in doomed)
+            self.touched -= doomed
+            if doomed:
+                self.sources = {s: e for s, e in self.sources.items() if e[2] not in doomed}
+
+            self.conn.execute("DELETE FROM sources")
+            self.conn.executemany("INSERT INTO sources VALUES (?, ?, ?, ?)",
+                                  [(s, size, mtime, digest) for s, (size, mtime, digest) in self.sources.items()])
+            self.conn.executemany("DELETE FROM thumbs WHERE digest = ?", [(d,) for d in doomed])
+            self.conn.executemany("UPDATE thumbs SET atime = ? WHERE digest = ?",
+                                  [(self.thumbs[d][1], d) for d in self.touched])
+            self.touched.clear()
+            self.conn.commit()
+            known = set(self.thumbs)
+
+        removed = len(doomed)
+        for digest in doomed:
+            try:
+                self.thumb_path(digest).unlink()
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"Error deleting cache file {digest}: {e}")
+
+        cutoff = time.time() - grace_seconds
+        for path in self.cache_dir.iterdir():
+            if path.stem in known and path.suffix == '.jpg':
+                continue
+            try:
+                st = path.stat()
+                if st.st_mtime < cutoff:
+                    path.unlink()
+                    removed += 1
+                    freed += st.st_size
+            except OSError:
+                pass
+        return removed, freed
+
+    def clear(self):
+        with self.lock:
+            self.sources.clear()
+            self.thumbs.clear()
+            self.touched.clear()
+            self.conn.execute("DELETE FROM sources")
+            self.conn.execute("DELETE FROM thumbs")
+            self.conn.commit()
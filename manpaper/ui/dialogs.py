@@ -46,6 +46,25 @@ def create_confirmation_dialog(window, title, body, confirm_text="Confirm",
     return dialog
 
 
+def create_message_dialog(window, title, body):
+    """
+    Creates a dialog that only shows a message.
+    
+    Args:
+        window: Parent window for the dialog
+        title: Dialog title text
+        body: Dialog body/message text
+        
+    Returns:
+        Adw.AlertDialog with a single close response
+    """
+    dialog = Adw.AlertDialog.new(title)
+    dialog.set_body(body)
+    dialog.add_response("close", "Close")
+    dialog.set_default_response("close")
+    return dialog
+
+
 def create_url_input_dialog(window, callback):
     """
     Creates a dialog for entering a YouTube video URL.
@@ -373,7 +392,8 @@ def create_online_properties_dialog(window, item, load_image_callback=None):
     Args:
         window: Parent window for the dialog
         item: OnlineWallpaperItem to show properties for
-        load_image_callback: Callback to load the full image (receives item, picture)
+        load_image_callback: Callback to load the full image (receives item, picture).
+            It may return a handle whose cancel() is called when the dialog closes.
         
     Returns:
         Adw.Dialog configured with online item properties
@@ -444,7 +464,9 @@ def create_online_properties_dialog(window, item, load_image_callback=None):
     
     # Load image if callback provided
     if load_image_callback:
-        load_image_callback(item, picture)
+        image_load = load_image_callback(item, picture)
+        if image_load:
+            dialog.connect("closed", lambda dlg: image_load.cancel())
 
     # Properties group
     props_group = Adw.PreferencesGroup()
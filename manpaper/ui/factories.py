@@ -1,4 +1,4 @@
-from gi.repository import Gtk, Pango, Gdk, GLib, Adw
+from gi.repository import Gtk, Pango, Gdk, GLib, Adw, GObject
 from pathlib import Path
 from ..data_models import OnlineWallpaperItem, WallpaperItem
 
@@ -36,11 +36,14 @@ def create_recode_popover_factory(app):
         if not queue_item: return
 
         main_label.set_text(queue_item.text)
-        status_label.set_text(queue_item.status)
+        if getattr(list_item, 'status_binding', None):
+            list_item.status_binding.unbind()
+        # Progress updates change status while the row is shown
+        list_item.status_binding = queue_item.bind_property('status', status_label, 'label', GObject.BindingFlags.SYNC_CREATE)
         
         if hasattr(stop_button, 'handler_id') and stop_button.handler_id > 0:
             stop_button.disconnect(stop_button.handler_id)
-        stop_button.handler_id = stop_button.connect("clicked", app._on_stop_one_recode_clicked, queue_item.wallpaper_item)
+        stop_button.handler_id = stop_button.connect("clicked", app._on_stop_one_recode_clicked, queue_item)
 
     factory.connect("setup", setup_cb)
     factory.connect("bind", bind_cb)
@@ -80,7 +83,10 @@ def create_download_popover_factory(app):
         if not queue_item: return
 
         main_label.set_text(queue_item.text)
-        status_label.set_text(queue_item.status)
+        if getattr(list_item, 'status_binding', None):
+            list_item.status_binding.unbind()
+        # Progress updates change status while the row is shown
+        list_item.status_binding = queue_item.bind_property('status', status_label, 'label', GObject.BindingFlags.SYNC_CREATE)
         
         if hasattr(stop_button, 'handler_id') and stop_button.handler_id > 0:
             stop_button.disconnect(stop_button.handler_id)
@@ -167,7 +173,10 @@ def create_online_item_factory(app):
 
         list_item.label_revealer.get_child().set_text(item.title or item.wall_id)
 
-        app._load_online_thumbnail(item, list_item.picture)
+        if getattr(list_item, 'thumbnail_token', None):
+            list_item.thumbnail_token.cancel()
+        list_item.picture.set_paintable(None) # Don't show the previous item's thumbnail while loading
+        list_item.thumbnail_token = app._load_online_thumbnail(item, list_item.picture)
 
         def update_download_button_ui(item_obj, is_downloaded, local_path):
             if is_downloaded:
@@ -199,6 +208,9 @@ def create_online_item_factory(app):
     def on_unbind(factory, list_item):
         if hasattr(list_item, 'handler_id') and list_item.get_item():
             list_item.get_item().disconnect(list_item.handler_id)
+        if getattr(list_item, 'thumbnail_token', None):
+            list_item.thumbnail_token.cancel()
+            list_item.thumbnail_token = None
 
     factory.connect("setup", on_setup)
     factory.connect("bind", on_bind)
@@ -208,6 +220,7 @@ def create_online_item_factory(app):
 def create_wallpaper_item_factory(app):
     """Creates a factory for items in the GridView (Static/Live)."""
     factory = Gtk.SignalListItemFactory()
+    placeholder = Gdk.Paintable.new_empty(16, 9)
 
     def on_setup(factory, list_item):
         revealer = Gtk.Revealer(transition_type=Gtk.RevealerTransitionType.SLIDE_UP, transition_duration=300)
@@ -254,21 +267,33 @@ def create_wallpaper_item_factory(app):
         list_item.handler_id = item.connect('preview-size-changed', on_size_changed)
         on_size_changed(item)
 
-        is_url = isinstance(item.path, str)
-        name = item.title or (item.path if is_url else item.path.name)
-        list_item.label_revealer.get_child().set_text(name)
-
-        thumb_path = app._get_thumbnail_path_or_trigger_generation(item)
-        if thumb_path:
-            if thumb_path not in app.texture_cache:
-                try:
-                    texture = Gdk.Texture.new_from_filename(thumb_path)
-                    app.texture_cache[thumb_path] = texture
-                except GLib.Error as e:
-                    print(f"Error loading texture {thumb_path}: {e}")
-            
-            if thumb_path in app.texture_cache:
-                list_item.picture.set_paintable(app.texture_cache[thumb_path])
+        def on_thumbnail_changed(item_obj):
+            is_url = isinstance(item_obj.path, str)
+            name = item_obj.title or (item_obj.path if is_url else item_obj.path.name)
+            list_item.label_revealer.get_child().set_text(name)
+
+            app.texture_loader.cancel(getattr(list_item, 'texture_request_id', 0))
+            list_item.texture_request_id = 0
+            app._cancel_thumbnail(getattr(list_item, 'thumbnail_job', None))
+
+            thumb_path, list_item.thumbnail_job = app._get_thumbnail_path_or_trigger_generation(item_obj)
+            texture = app.texture_cache.get(thumb_path) if thumb_path else None
+            if texture is not None:
+                list_item.picture.set_paintable(texture)
+                return
+
+            list_item.picture.set_paintable(placeholder)
+            if thumb_path:
+                def on_texture_loaded(loaded_texture):
+                    list_item.texture_request_id = 0
+                    list_item.picture.set_paintable(loaded_texture)
+                def on_texture_failed():
+                    list_item.texture_request_id = 0
+                    app._on_thumbnail_unreadable(item_obj)
+                list_item.texture_request_id = app.texture_loader.load(thumb_path, on_texture_loaded, on_texture_failed)
+
+        list_item.thumbnail_handler_id = item.connect('thumbnail-changed', on_thumbnail_changed)
+        on_thumbnail_changed(item)
         
         list_item.get_child().set_reveal_child(False)
         # Cap reveal delay to prevent lag with large lists (roughly 2 rows of items)
@@ -286,6 +311,12 @@ def create_wallpaper_item_factory(app):
     def on_unbind(factory, list_item):
         if hasattr(list_item, 'handler_id') and list_item.get_item():
             list_item.get_item().disconnect(list_item.handler_id)
+        if hasattr(list_item, 'thumbnail_handler_id') and list_item.get_item():
+            list_item.get_item().disconnect(list_item.thumbnail_handler_id)
+        app.texture_loader.cancel(getattr(list_item, 'texture_request_id', 0))
+        list_item.texture_request_id = 0
+        app._cancel_thumbnail(getattr(list_item, 'thumbnail_job', None))
+        list_item.thumbnail_job = None
 
     factory.connect("setup", on_setup)
     factory.connect("bind", on_bind)
@@ -1,9 +1,11 @@
+import os
 import gi
 gi.require_version('Gtk', '4.0')
 gi.require_version('Adw', '1')
 from gi.repository import Gtk, Adw, Gio, GLib
 
 from ..utils import is_backend_installed
+from ..recode import RECODE_PROFILES, DEFAULT_RECODE_PROFILE
 
 # --- Preferences Window ---
 class PreferencesWindow:
@@ -13,6 +15,7 @@ class PreferencesWindow:
         self.settings = app.settings
         self.volume_label = None
         self.entry_custom_css_path = None
+        self.cache_size_row = None
 
     def _setup_slider_scroll_controller(self, slider):
         """Adds a scroll controller to a slider to allow changing value with the mouse wheel."""
@@ -51,6 +54,24 @@ class PreferencesWindow:
         row_clear_cache.add_suffix(clear_button)
         row_clear_cache.set_activatable_widget(clear_button)
         general_group.add(row_clear_cache)
+        self.cache_size_row = row_clear_cache
+        self.app._update_thumbnail_cache_size_label()
+
+        row_cache_max_size = Adw.ActionRow(title="Thumbnail Cache Size Limit", subtitle="Least recently viewed thumbnails are removed above this size, in MB")
+        cache_max_size_adjustment = Gtk.Adjustment(value=self.app.thumbnail_cache_max_size, lower=64, upper=16384, step_increment=64)
+        cache_max_size_adjustment.connect('value-changed', self.app._on_thumbnail_cache_max_size_changed)
+        cache_max_size_spin = Gtk.SpinButton(adjustment=cache_max_size_adjustment, digits=0, margin_top=8, margin_bottom=8)
+        row_cache_max_size.add_suffix(cache_max_size_spin)
+        row_cache_max_size.set_activatable_widget(cache_max_size_spin)
+        general_group.add(row_cache_max_size)
+
+        row_texture_budget = Adw.ActionRow(title="Preview Memory Budget", subtitle="Decoded previews kept in memory, in MB")
+        texture_budget_adjustment = Gtk.Adjustment(value=self.app.texture_cache_budget, lower=32, upper=4096, step_increment=32)
+        texture_budget_adjustment.connect('value-changed', self.app._on_texture_cache_budget_changed)
+        texture_budget_spin = Gtk.SpinButton(adjustment=texture_budget_adjustment, digits=0, margin_top=8, margin_bottom=8)
+        row_texture_budget.add_suffix(texture_budget_spin)
+        row_texture_budget.set_activatable_widget(texture_budget_spin)
+        general_group.add(row_texture_budget)
 
         online_group = Adw.PreferencesGroup(title="Online Settings")
         preferences_page.add(online_group)
@@ -60,6 +81,22 @@ class PreferencesWindow:
         row_api_key.connect('changed', self._on_api_key_changed)
         online_group.add(row_api_key)
 
+        row_search_ttl = Adw.ActionRow(title="Search Cache Lifetime", subtitle="Minutes before cached search results are refreshed")
+        search_ttl_adjustment = Gtk.Adjustment(value=self.app.search_cache_ttl, lower=0, upper=1440, step_increment=5)
+        search_ttl_adjustment.connect('value-changed', self.app._on_search_cache_ttl_changed)
+        search_ttl_spin = Gtk.SpinButton(adjustment=search_ttl_adjustment, digits=0, margin_top=8, margin_bottom=8)
+        row_search_ttl.add_suffix(search_ttl_spin)
+        row_search_ttl.set_activatable_widget(search_ttl_spin)
+        online_group.add(row_search_ttl)
+
+        row_bandwidth = Adw.ActionRow(title="Download Bandwidth Limit", subtitle="Shared by all downloads, in KB/s (0 for unlimited)")
+        bandwidth_adjustment = Gtk.Adjustment(value=self.app.download_bandwidth_limit, lower=0, upper=1024000, step_increment=256)
+        bandwidth_adjustment.connect('value-changed', self.app._on_download_bandwidth_limit_changed)
+        bandwidth_spin = Gtk.SpinButton(adjustment=bandwidth_adjustment, digits=0, margin_top=8, margin_bottom=8)
+        row_bandwidth.add_suffix(bandwidth_spin)
+        row_bandwidth.set_activatable_widget(bandwidth_spin)
+        online_group.add(row_bandwidth)
+
         all_static_backends = ['swaybg', 'swww', 'hyprpaper']
         installed_static_backends = [b for b in all_static_backends if is_backend_installed(b)]
 
@@ -102,6 +139,48 @@ class PreferencesWindow:
             row_hide_original.connect('notify::active', self.app._on_hide_original_toggled)
             video_group.add(row_hide_original)
 
+            recode_profile_keys = list(RECODE_PROFILES)
+            row_recode_profile = Adw.ComboRow(title="Recode Profile", subtitle="Encoder settings for recoded videos",
+                                              model=Gtk.StringList.new([RECODE_PROFILES[k].name for k in recode_profile_keys]))
+            try:
+                row_recode_profile.set_selected(recode_profile_keys.index(self.app.recode_profile))
+            except ValueError:
+                row_recode_profile.set_selected(recode_profile_keys.index(DEFAULT_RECODE_PROFILE))
+            row_recode_profile.connect('notify::selected', self.app._on_recode_profile_changed)
+            video_group.add(row_recode_profile)
+
+            row_recode_fps = Adw.ActionRow(title="Recode Frame Rate Cap", subtitle="Faster videos are resampled (0 for the monitor's refresh rate)")
+            recode_fps_adjustment = Gtk.Adjustment(value=self.app.recode_max_fps, lower=0, upper=240, step_increment=1)
+            recode_fps_adjustment.connect('value-changed', self.app._on_recode_max_fps_changed)
+            recode_fps_spin = Gtk.SpinButton(adjustment=recode_fps_adjustment, digits=0, margin_top=8, margin_bottom=8)
+            row_recode_fps.add_suffix(recode_fps_spin)
+            row_recode_fps.set_activatable_widget(recode_fps_spin)
+            video_group.add(row_recode_fps)
+
+            row_loop_crossfade = Adw.ActionRow(title="Seamless Loop Crossfade", subtitle="Seconds blended at the loop point (0 to only cut on a keyframe)")
+            loop_crossfade_adjustment = Gtk.Adjustment(value=self.app.loop_crossfade, lower=0, upper=5, step_increment=0.1)
+            loop_crossfade_adjustment.connect('value-changed', self.app._on_loop_crossfade_changed)
+            loop_crossfade_spin = Gtk.SpinButton(adjustment=loop_crossfade_adjustment, digits=1, margin_top=8, margin_bottom=8)
+            row_loop_crossfade.add_suffix(loop_crossfade_spin)
+            row_loop_crossfade.set_activatable_widget(loop_crossfade_spin)
+            video_group.add(row_loop_crossfade)
+
+            row_recode_workers = Adw.ActionRow(title="Parallel Recodes", subtitle="Videos recoded at the same time")
+            recode_workers_adjustment = Gtk.Adjustment(value=self.app.recode_workers, lower=1, upper=max(1, os.cpu_count() or 1), step_increment=1)
+            recode_workers_adjustment.connect('value-changed', self.app._on_recode_workers_changed)
+            recode_workers_spin = Gtk.SpinButton(adjustment=recode_workers_adjustment, digits=0, margin_top=8, margin_bottom=8)
+            row_recode_workers.add_suffix(recode_workers_spin)
+            row_recode_workers.set_activatable_widget(recode_workers_spin)
+            video_group.add(row_recode_workers)
+
+            row_recode_threads = Adw.ActionRow(title="Recode Thread Budget", subtitle="Shared by all running recodes (0 for one per CPU)")
+            recode_threads_adjustment = Gtk.Adjustment(value=self.app.recode_thread_budget, lower=0, upper=256, step_increment=1)
+            recode_threads_adjustment.connect('value-changed', self.app._on_recode_thread_budget_changed)
+            recode_threads_spin = Gtk.SpinButton(adjustment=recode_threads_adjustment, digits=0, margin_top=8, margin_bottom=8)
+            row_recode_threads.add_suffix(recode_threads_spin)
+            row_recode_threads.set_activatable_widget(recode_threads_spin)
+            video_group.add(row_recode_threads)
+
             row_recode_all = Adw.ActionRow(title="Recode all High-Res videos")
             btn_recode_all = Gtk.Button(label="Recode All", margin_top=8, margin_bottom=8)
             btn_recode_all.connect('clicked', self.app._on_recode_all_clicked)
@@ -186,6 +186,9 @@ class MainWindow(Adw.ApplicationWindow):
         self.online_view = self._create_grid_view(self.app.online_model, create_online_item_factory(self.app))
         scrolled_online_view = self._create_scrolled_window(self.online_view)
         scrolled_online_view.set_vexpand(True)
+        online_vadjustment = scrolled_online_view.get_vadjustment()
+        online_vadjustment.connect('value-changed', self.app._on_online_scroll_changed)
+        online_vadjustment.connect('changed', self.app._on_online_scroll_changed)
         online_page_box.append(scrolled_online_view)
 
         self.load_more_button = Gtk.Button(label="Load More")
@@ -0,0 +1,63 @@
+import types
+import unittest
+
+try:
+    from manpaper.app import Manpaper
+    from manpaper.online import CancelToken
+    import_error = None
+except ImportError as e: # GTK, libadwaita and requests are needed to import the app
+    import_error = e
+
+class FakeStore:
+    def __init__(self):
+        self.items = []
+
+    def get_n_items(self):
+        return len(self.items)
+
+    def get_item(self, position):
+        return self.items[position]
+
+    def splice(self, position, n_removals, additions):
+        self.items[position:position + n_removals] = additions
+
+def results(*wall_ids, last_page=5):
+    return {"items": [types.SimpleNamespace(wall_id=w) for w in wall_ids], "meta": {"last_page": last_page}}
+
+@unittest.skipIf(import_error, f"app not importable: {import_error}")
+class OnlineRevalidationTest(unittest.TestCase):
+    def setUp(self):
+        app = types.SimpleNamespace(
+            online_store=FakeStore(), online_search_token=CancelToken(), online_last_page=None,
+            online_first_page_size=0, online_current_page=1, online_page_loading=False, background_tasks=1,
+            _update_spinner=lambda: None, _update_load_more_button=lambda: None,
+            _update_status_page_visibility=lambda: None, _prefetch_online_thumbnails=lambda items: None,
+        )
+        app._show_online_results = lambda *args: Manpaper._show_online_results(app, *args)
+        self.app = app
+
+    def finish(self, page, page_results, revalidating):
+        self.app.background_tasks += 1
+        Manpaper._on_online_search_finished(self.app, self.app.online_search_token, page, page_results, revalidating)
+
+    def wall_ids(self):
+        return [item.wall_id for item in self.app.online_store.items]
+
+    def test_revalidated_page_one_keeps_later_pages(self):
+        Manpaper._show_online_results(self.app, results('a', 'b', 'c'), 1) # Cached page 1
+        self.app.online_current_page = 2
+        self.finish(2, results('d', 'e'), revalidating=False)
+        self.finish(1, results('x', 'a', 'b'), revalidating=True)
+        self.assertEqual(self.wall_ids(), ['x', 'a', 'b', 'd', 'e'])
+        self.assertEqual(self.app.online_first_page_size, 3)
+        self.assertEqual(self.app.online_current_page, 2)
+
+    def test_unchanged_page_one_is_left_alone(self):
+        Manpaper._show_online_results(self.app, results('a', 'b'), 1)
+        self.finish(2, results('c'), revalidating=False)
+        before = list(self.app.online_store.items)
+        self.finish(1, results('a', 'b'), revalidating=True)
+        self.assertEqual(self.app.online_store.items, before)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from manpaper.thumbnails import ThumbnailManifest
+
+class ThumbnailManifestTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_dir = Path(self.tmp.name) / 'thumbnails'
+        self.cache_dir.mkdir()
+        self.manifest = ThumbnailManifest(self.cache_dir, Path(self.tmp.name) / 'thumbnails.db')
+        for n in range(3):
+            digest = f'digest{n}'
+            self.manifest.thumb_path(digest).write_bytes(b'x' * 100)
+            self.manifest.record(f'/wallpapers/{n}.png', 1000 + n, 1, digest)
+
+    def tearDown(self):
+        self.manifest.conn.close()
+        self.tmp.cleanup()
+
+    def thumb_files(self):
+        return sorted(p.name for p in self.cache_dir.iterdir())
+
+    def test_empty_library_keeps_thumbnails(self):
+        for live_sources in (set(), None):
+            self.assertEqual(self.manifest.collect_garbage(live_sources, 1024 * 1024), (0, 0))
+        self.assertEqual(len(self.thumb_files()), 3)
+        self.assertIsNotNone(self.manifest.lookup('/wallpapers/0.png', 1000, 1))
+
+    def test_orphans_are_removed(self):
+        removed, freed = self.manifest.collect_garbage({'/wallpapers/1.png': (1001, 1)}, 1024 * 1024)
+        self.assertEqual((removed, freed), (2, 200))
+        self.assertEqual(self.thumb_files(), ['digest1.jpg'])
+        self.assertIsNone(self.manifest.lookup('/wallpapers/0.png', 1000, 1))
+
+    def test_size_limit_applies_without_library(self):
+        self.manifest.lookup('/wallpapers/2.png', 1002, 1) # Most recently used
+        removed, _ = self.manifest.collect_garbage(None, 150)
+        self.assertEqual(removed, 2)
+        self.assertEqual(self.thumb_files(), ['digest2.jpg'])
+
+    def test_stale_sources_are_removed(self):
+        current = {'/wallpapers/0.png': (1000, 2), '/wallpapers/1.png': (1001, 1), '/wallpapers/2.png': None}
+        self.assertEqual(self.manifest.stale_sources(current), ['/wallpapers/0.png'])
+        removed, _ = self.manifest.collect_garbage(current, 1024 * 1024)
+        self.assertEqual(removed, 1)
+        self.assertEqual(self.thumb_files(), ['digest1.jpg', 'digest2.jpg'])
+
+    def test_forget_drops_source_and_file(self):
+        self.manifest.forget('/wallpapers/0.png')
+        self.assertIsNone(self.manifest.lookup('/wallpapers/0.png', 1000, 1))
+        self.assertFalse(self.manifest.has_thumb('digest0'))
+        self.assertNotIn('digest0.jpg', self.thumb_files())
+        self.assertIsNotNone(self.manifest.lookup('/wallpapers/1.png', 1001, 1))
+
+if __name__ == '__main__':
+    unittest.main()